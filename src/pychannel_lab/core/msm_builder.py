@@ -25,11 +25,13 @@ Example expressions:
 
 import math
 import json
+import hashlib
 from copy import deepcopy
 from dataclasses import dataclass, field
 from typing import Callable
 
 import numpy as np
+from scipy import sparse
 
 from core.config import EXP_FACTOR
 
@@ -129,6 +131,23 @@ class MSMDefinition:
             full[i] = p.initial_value if p.frozen else next(free_iter)
         return full
 
+    @property
+    def fingerprint(self) -> str:
+        """Digest of the topology and rate expressions (not parameter values).
+
+        Two definitions with the same fingerprint build the same Q for the
+        same parameter vector, so it can key caches of derived matrices.
+        """
+        spec = {
+            "states": [(s.name, s.state_type) for s in self.states],
+            "transitions": [
+                (t.from_state, t.to_state, t.rate_expr) for t in self.transitions
+            ],
+            "parameters": self.param_names,
+        }
+        raw = json.dumps(spec, sort_keys=True).encode()
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
     @property
     def default_initial_conditions(self) -> np.ndarray:
         """Uniform distribution over closed states; 0 everywhere else."""
@@ -310,6 +329,24 @@ class DynamicModel:
             Q[i, i] -= rate
         return Q
 
+    def build_Q_sparse(self, V: float):
+        """
+        Generator matrix Q at voltage V as a scipy.sparse CSC matrix.
+
+        Same entries as build_Q, without materialising the dense n × n array.
+        """
+        ns = {**self._base_ns, "V": V}
+        n = self.defn.n_states
+        T = len(self._transitions)
+        rows, cols = np.empty(2 * T, dtype=int), np.empty(2 * T, dtype=int)
+        data = np.empty(2 * T)
+        for t, (i, j, expr) in enumerate(self._transitions):
+            rate = eval(expr, ns)  # noqa: S307
+            rows[t], cols[t], data[t] = j, i, rate
+            rows[T + t], cols[T + t], data[T + t] = i, i, -rate
+        # duplicate (row, col) entries are summed on conversion
+        return sparse.csc_matrix((data, (rows, cols)), shape=(n, n))
+
 
 # ---------------------------------------------------------------------------
 # Layout helper for the network diagram
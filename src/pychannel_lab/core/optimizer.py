@@ -32,6 +32,8 @@ class CostFunction:
         If provided, the optimiser uses the dynamic model.
     act_cfg … rec_cfg : protocol config dataclasses
     g_k_max, t_total, dt : simulation settings
+    initial_state : array-like or "steady", optional
+        Passed to ProtocolSimulator.
     """
 
     _DEFAULT_WEIGHTS = {
@@ -53,6 +55,7 @@ class CostFunction:
         g_k_max: float = None,
         t_total: float = None,
         dt: float = None,
+        initial_state=None,
     ):
         self.exp = experimental_data
         self.w = weights or self._DEFAULT_WEIGHTS
@@ -64,6 +67,7 @@ class CostFunction:
         self._g_k_max = g_k_max
         self._t_total = t_total
         self._dt = dt
+        self._initial_state = initial_state
 
     # ------------------------------------------------------------------
 
@@ -87,6 +91,8 @@ class CostFunction:
             kw["t_total"] = self._t_total
         if self._dt is not None:
             kw["dt"] = self._dt
+        if self._initial_state is not None:
+            kw["initial_state"] = self._initial_state
         return ProtocolSimulator(parameters, **kw)
 
     @staticmethod
@@ -4,7 +4,7 @@ so the user can freely adjust timing and voltage parameters.
 """
 
 import numpy as np
-from typing import Callable
+from typing import Callable, NamedTuple
 from core.config import (
     ActivationConfig,
     InactivationConfig,
@@ -13,6 +13,15 @@ from core.config import (
 )
 
 
+class Segment(NamedTuple):
+    """Constant-voltage piece of a sweep: ``voltage`` on [t_start, t_end)."""
+
+    t_start: float
+    t_end: float
+    voltage: float
+    phase: str
+
+
 class ActivationProtocol:
     """
     Step protocol sweeping test voltages for activation (G/V curve).
@@ -52,6 +61,15 @@ class ActivationProtocol:
 
         return voltage
 
+    def get_segments(self, v_test: float, t_end: float) -> list:
+        """Piecewise-constant description of one sweep, ending at *t_end*."""
+        c = self.cfg
+        return [
+            Segment(0.0, self.t_pulse_start, c.v_hold, "hold"),
+            Segment(self.t_pulse_start, self.t_pulse_end, v_test, "test"),
+            Segment(self.t_pulse_end, t_end, c.v_tail, "tail"),
+        ]
+
 
 class InactivationProtocol:
     """
@@ -89,6 +107,15 @@ class InactivationProtocol:
 
         return voltage
 
+    def get_segments(self, v_cond: float, t_end: float) -> list:
+        """Piecewise-constant description of one sweep, ending at *t_end*."""
+        c = self.cfg
+        return [
+            Segment(0.0, c.t_hold, c.v_hold, "hold"),
+            Segment(c.t_hold, self.t_test_start, v_cond, "cond"),
+            Segment(self.t_test_start, t_end, c.v_depo, "test"),
+        ]
+
 
 class CSInactivationProtocol:
     """
@@ -127,6 +154,16 @@ class CSInactivationProtocol:
 
         return voltage
 
+    def get_segments(self, t_pulse: float, t_end: float) -> list:
+        """Piecewise-constant description of one sweep, ending at *t_end*."""
+        c = self.cfg
+        return [
+            Segment(0.0, c.t_initial, c.v_hold, "hold"),
+            Segment(c.t_initial, t_pulse, c.v_prep, "prep"),
+            Segment(t_pulse, c.t_test_end, c.v_depo, "test"),
+            Segment(c.t_test_end, t_end, c.v_hold, "tail"),
+        ]
+
 
 class RecoveryProtocol:
     """
@@ -165,3 +202,13 @@ class RecoveryProtocol:
                 return c.v_depo
 
         return voltage
+
+    def get_segments(self, t_rec_end: float, t_end: float) -> list:
+        """Piecewise-constant description of one sweep, ending at *t_end*."""
+        c = self.cfg
+        return [
+            Segment(0.0, c.t_prep, c.v_hold, "hold"),
+            Segment(c.t_prep, c.t_pulse, c.v_depo, "pulse"),
+            Segment(c.t_pulse, t_rec_end, c.v_hold, "recovery"),
+            Segment(t_rec_end, t_end, c.v_depo, "test"),
+        ]
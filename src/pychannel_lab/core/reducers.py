@@ -0,0 +1,151 @@
+"""
+Streaming observable reducers for the NumPy simulator.
+
+A reducer watches a half-open window [i_start, i_end) of state indices on
+the dt grid and folds the open probability of every state in that window
+into a single number while the simulator produces it, so the full
+(len(t), n_states) state matrix is never stored.
+
+The simulator feeds reducers blocks of states through
+``update(k_first, open_probs, states, stride)``, where row r of the block is
+state index ``k_first + r·stride``.  Blocks may arrive in any order and may
+only partly overlap the window.  Propagators that do not walk the grid (e.g. the
+eigendecomposition propagator) instead ``offer`` individual candidate
+states, possibly at fractional grid indices.  Besides the reduced ``value``
+every reducer keeps the ``index`` and full ``state`` vector it was taken
+from.
+
+Every reducer also folds the samples it sees into two interleaved halves
+(even and odd ``(k - i_start) // stride``), i.e. the same reduction on the
+two grids of twice the spacing; the first sample of the window belongs to
+both, since window edges are sampled exactly at any spacing.  ``error``, the largest deviation of either
+half from ``value``, is a cheap estimate of the sampling error of ``value``;
+it is zero for single-index windows and for candidates offered in continuous
+time.
+"""
+
+import numpy as np
+
+
+class Reducer:
+    """
+    Base class: fold open probabilities over state indices [i_start, i_end).
+
+    Parameters
+    ----------
+    i_start : int — first state index of the window.
+    i_end   : int or None — one past the last index; None = end of the grid.
+    """
+
+    def __init__(self, i_start: int, i_end: int = None):
+        self.i_start = int(i_start)
+        self.i_end = None if i_end is None else int(i_end)
+        self.value = None
+        self.index = None
+        self.state = None
+        self.halves = [None, None]
+
+    @property
+    def error(self) -> float:
+        """Sampling-error estimate of value (see module docstring)."""
+        devs = [abs(self.value - h) for h in self.halves if h is not None]
+        return max(devs, default=0.0)
+
+    def window(self, n_total: int) -> tuple:
+        """Window clipped to a grid whose last state index is *n_total*."""
+        end = n_total + 1 if self.i_end is None else min(self.i_end, n_total + 1)
+        return max(self.i_start, 0), end
+
+    def _overlap(self, k_first: int, n: int, stride: int = 1) -> tuple:
+        """Rows [a, b) of a strided block that fall inside the window."""
+        a = max(-(-(self.i_start - k_first) // stride), 0)
+        if self.i_end is None:
+            return a, n
+        return a, min(-(-(self.i_end - k_first) // stride), n)
+
+    def _better(self, candidate: float) -> bool:
+        return self._better_than(candidate, self.value)
+
+    def _better_than(self, candidate: float, current: float) -> bool:
+        raise NotImplementedError
+
+    def _pick(self, open_probs: np.ndarray) -> int:
+        raise NotImplementedError
+
+    def best(self, open_probs: np.ndarray) -> int:
+        """Position of the best of *open_probs* under this reducer's ordering."""
+        return self._pick(open_probs)
+
+    def update(
+        self,
+        k_first: int,
+        open_probs: np.ndarray,
+        states: np.ndarray,
+        stride: int = 1,
+    ):
+        """Fold the block whose row r is the state at grid index k_first + r·stride."""
+        a, b = self._overlap(k_first, len(open_probs), stride)
+        if a >= b:
+            return
+        r = a + self._pick(open_probs[a:b])
+        self._offer(k_first + r * stride, float(open_probs[r]), states[r])
+
+        # interleaved halves → the same reduction at twice the spacing
+        first = k_first + a * stride
+        if first - stride < self.i_start:
+            self._offer_half(1, float(open_probs[a]))
+        parity = ((first - self.i_start) // stride) % 2
+        for q in (0, 1):
+            start = a + (q - parity) % 2
+            if start < b:
+                rc = start + 2 * self._pick(open_probs[start:b:2])
+                self._offer_half(q, float(open_probs[rc]))
+
+    def offer(self, index: float, value: float, state: np.ndarray):
+        """Consider one candidate; the caller guarantees it lies in the window."""
+        self._offer(index, value, state)
+        self._offer_half(0, value)
+        self._offer_half(1, value)
+
+    def _offer(self, index: float, value: float, state: np.ndarray):
+        if self.value is None or self._better(value):
+            self.value = float(value)
+            self.index = index
+            self.state = np.array(state, dtype=float)
+
+    def _offer_half(self, q: int, value: float):
+        if self.halves[q] is None or self._better_than(value, self.halves[q]):
+            self.halves[q] = float(value)
+
+
+class WindowMax(Reducer):
+    """Running maximum of the open probability over the window."""
+
+    def _better_than(self, candidate: float, current: float) -> bool:
+        return candidate > current
+
+    def _pick(self, open_probs: np.ndarray) -> int:
+        return int(np.argmax(open_probs))
+
+
+class WindowMin(Reducer):
+    """Running minimum of the open probability over the window."""
+
+    def _better_than(self, candidate: float, current: float) -> bool:
+        return candidate < current
+
+    def _pick(self, open_probs: np.ndarray) -> int:
+        return int(np.argmin(open_probs))
+
+
+class ValueAt(Reducer):
+    """Open probability at a single state index."""
+
+    def __init__(self, i: int):
+        super().__init__(i, i + 1)
+
+    def _better_than(self, candidate: float, current: float) -> bool:
+        return False
+
+    def _pick(self, open_probs: np.ndarray) -> int:
+        return 0
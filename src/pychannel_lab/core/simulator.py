@@ -4,14 +4,62 @@ Matrix-exponential simulator for all four voltage-clamp protocols.
 P(t + dt) = expm(Q(V) · dt) @ P(t)
 
 Exact for piecewise-constant voltage within each dt step.
+
+Two propagation modes are available:
+  - "segment" (default) — every constant-voltage segment is jumped with a
+    single expm; the dt grid is only sampled inside the windows that the
+    observables read (peak windows, baseline points).  The sweeps of a
+    protocol are merged into a prefix tree so that shared leading segments
+    (e.g. the holding phase) are propagated once, and sweeps that sit in
+    the same voltage segment are advanced together as one state matrix.
+    Jumps of k steps use binary exponentiation, M^k P = Π M^(2^i) P over
+    the set bits of k, from a cached stack of repeated squares of
+    M = expm(Q(V)·dt), so no expm is needed per distinct segment length.
+  - "grid" — reference implementation that steps the full 0…t_total grid.
+
+Both modes sample the same dt grid.  They agree to rounding error, except
+that the grid-mode voltage functions of the CSI and recovery protocols keep
+the prepulse / inactivating pulse for one extra dt step.
+
+Observables (peaks, baselines) are computed by streaming reducers from
+core.reducers, so neither mode stores the full state trajectory.
+
+In segment mode the sampling resolution can be set per protocol phase
+(``resolution``): inside the observation windows of a phase only every
+stride-th dt step is sampled (plus the window ends), e.g. a fine grid for the
+"test" pulses and a coarse one for long "tail"/"recovery" phases.  Phases
+without observation windows (holding, conditioning) are always a single jump.
+After every run_* call, ``errors[name]`` holds a per-point estimate of the
+sampling error of the returned observable (see core.reducers).
+
+Matrices derived from Q(V) (expm jumps, step-power stacks, eigen-
+decompositions) live in one module-level LRU cache keyed by parameter
+digest, model fingerprint, V and dt.  It is shared by all protocols and all
+simulator instances, so repeated cost evaluations at the same parameters
+(finite-difference probes, restarts, plotting) rebuild nothing.  See
+matrix_cache_info(), clear_matrix_cache() and set_matrix_cache_size().
+
+Dense expm costs O(n³) per voltage.  For large models (allosteric or
+multi-subunit topologies with hundreds of states) the segment engine can
+instead keep Q(V) sparse and apply its exponential to the state columns
+with scipy.sparse.linalg.expm_multiply (Krylov/truncated-Taylor action,
+cost ∝ nnz(Q)·‖Q‖·t); it is selected automatically above
+KRYLOV_MIN_STATES states and reported in ``linalg``.
+
 Accepts either:
   - a plain parameter array (uses the hardcoded IonChannelModel for speed)
   - an MSMDefinition  (builds a DynamicModel at run-time, supports any topology)
 """
 
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
 import numpy as np
+from scipy import sparse
 from scipy.linalg import expm as _matrix_expm
-from typing import Callable, Tuple
+from scipy.sparse.linalg import expm_multiply
+from typing import Callable, List, Tuple
 
 from core.config import (
     INITIAL_CONDITIONS,
@@ -29,6 +77,84 @@ from core.protocols import (
     CSInactivationProtocol,
     RecoveryProtocol,
 )
+from core.reducers import ValueAt, WindowMax
+from core.spectral import EigenPropagator
+from core.steady_state import stationary_distribution
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+class _LRUCache:
+    """Thread-safe bounded mapping with least-recently-used eviction."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build: Callable):
+        """Return the value for *key*, calling build() on a miss."""
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+        value = build()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+
+# Matrices derived from Q(V) — expm jumps, step-power stacks, eigen-
+# decompositions — shared by all protocols and all ProtocolSimulator
+# instances, keyed by (kind, parameter digest, model fingerprint, V, dt, …).
+_MATRIX_CACHE = _LRUCache(maxsize=256)
+
+
+def matrix_cache_info() -> CacheInfo:
+    """Hit/miss counters and size of the shared matrix cache."""
+    return _MATRIX_CACHE.info()
+
+
+def clear_matrix_cache() -> None:
+    """Drop all cached matrices and reset the counters."""
+    _MATRIX_CACHE.clear()
+
+
+def set_matrix_cache_size(maxsize: int) -> None:
+    """Change the maximum number of cached entries (evicting LRU ones)."""
+    _MATRIX_CACHE.resize(maxsize)
+
+
+class _SweepNode:
+    """Prefix-tree node: one (k0, k1, V) segment shared by several sweeps."""
+
+    __slots__ = ("segment", "children", "reducers")
+
+    def __init__(self, segment):
+        self.segment = segment
+        self.children: dict = {}
+        self.reducers: list = []  # reducers of every sweep through this node
 
 
 class ProtocolSimulator:
@@ -48,11 +174,56 @@ class ProtocolSimulator:
         Simulation time grid.
     g_k_max : float
         Maximum channel conductance (nS).
-    initial_state : array-like, optional
+    initial_state : array-like or "steady", optional
         Initial probability distribution.  Defaults to INITIAL_CONDITIONS
-        (11-state) or msm_def.default_initial_conditions.
+        (11-state) or msm_def.default_initial_conditions.  "steady" starts
+        every protocol from the stationary distribution of Q at its holding
+        voltage (core.steady_state), i.e. fully equilibrated.
+    mode : {"segment", "grid"}
+        Propagation engine (see module docstring).
+    propagator : {"expm", "eig", "refine"}
+        How the segment engine evaluates observation windows.  "expm" walks
+        the dt grid; "eig" diagonalises Q(V) once per voltage, evaluates the
+        state in closed form and locates peaks in continuous time by
+        root-finding (see core.spectral).  Segments whose Q is numerically
+        defective fall back to "expm".  "refine" scans each window on a
+        coarse power-of-two lattice and bisects around the best point down
+        to single dt steps (O(log w) products for a w-step window).
+    linalg : {"auto", "dense", "krylov"}
+        "dense" caches expm(Q·dt) and its powers; "krylov" keeps Q sparse
+        and uses expm_multiply (segment mode only).  "auto" picks "krylov"
+        for models with at least KRYLOV_MIN_STATES states.  The resolved
+        choice is stored in the ``linalg`` attribute.
+    resolution : int or dict, optional
+        Sampling stride (in dt steps) inside observation windows, segment
+        mode only.  An int applies to every phase; a dict maps phase names
+        (Segment.phase, e.g. "test", "tail", "pulse") to strides, with the
+        optional key "default" for the rest.  None samples every dt step.
+
+    Attributes
+    ----------
+    errors : dict
+        Protocol name → array of sampling-error estimates of the values
+        returned by the latest run of that protocol.
     """
 
+    _MODES = ("segment", "grid")
+    _PROPAGATORS = ("expm", "eig", "refine")
+    _LINALG = ("auto", "dense", "krylov")
+
+    # Model size from which linalg="auto" switches to sparse Krylov
+    # propagation (break-even of a 20-sweep activation run on a chain
+    # model; below it the cached dense powers win).
+    KRYLOV_MIN_STATES = 150
+
+    # Number of consecutive dt steps sampled per batched matmul in the
+    # segment engine.
+    _BLOCK = 256
+
+    # Approximate number of coarse lattice points per window for
+    # propagator="refine".
+    _N_COARSE = 32
+
     def __init__(
         self,
         parameters,
@@ -65,16 +236,46 @@ class ProtocolSimulator:
         dt: float = TIME_PARAMS["dt"],
         g_k_max: float = G_K_MAX,
         initial_state=None,
+        mode: str = "segment",
+        propagator: str = "expm",
+        resolution=None,
+        linalg: str = "auto",
     ):
+        if mode not in self._MODES:
+            raise ValueError(f"mode must be one of {self._MODES}, got {mode!r}")
+        if propagator not in self._PROPAGATORS:
+            raise ValueError(
+                f"propagator must be one of {self._PROPAGATORS}, got {propagator!r}"
+            )
+        if linalg not in self._LINALG:
+            raise ValueError(f"linalg must be one of {self._LINALG}, got {linalg!r}")
+        if linalg == "krylov" and mode != "segment":
+            raise ValueError("linalg='krylov' is only supported in segment mode")
+        self._strides = self._parse_resolution(resolution)
+        if self._strides and mode != "segment":
+            raise ValueError("resolution is only supported in segment mode")
+        self.steady = isinstance(initial_state, str)
+        if self.steady:
+            if initial_state != "steady":
+                raise ValueError(
+                    f"initial_state must be an array or 'steady', got {initial_state!r}"
+                )
+            initial_state = None
         self.params = np.asarray(parameters, dtype=float)
         self.t_total = t_total
         self.dt = dt
         self.g_k_max = g_k_max
+        self.mode = mode
+        self.propagator = propagator
+        self._param_digest = hashlib.blake2b(
+            self.params.tobytes(), digest_size=16
+        ).hexdigest()
 
         if msm_def is not None:
             from core.msm_builder import DynamicModel
 
             self.model = DynamicModel(msm_def, self.params)
+            self._model_key = msm_def.fingerprint
             self._open_idx = msm_def.open_state_indices  # list of ints
             self.s0 = (
                 msm_def.default_initial_conditions
@@ -83,6 +284,7 @@ class ProtocolSimulator:
             )
         else:
             self.model = IonChannelModel(self.params)
+            self._model_key = "IonChannelModel"
             self._open_idx = [10]  # default 11-state model: O is index 10
             self.s0 = (
                 INITIAL_CONDITIONS
@@ -90,10 +292,36 @@ class ProtocolSimulator:
                 else np.asarray(initial_state, dtype=float)
             )
 
+        if linalg == "auto":
+            big = len(self.s0) >= self.KRYLOV_MIN_STATES
+            linalg = "krylov" if big and mode == "segment" else "dense"
+        self.linalg = linalg
+
         self.act_proto = ActivationProtocol(act_cfg)
         self.inact_proto = InactivationProtocol(inact_cfg)
         self.csi_proto = CSInactivationProtocol(csi_cfg)
         self.rec_proto = RecoveryProtocol(rec_cfg)
+        self.errors: dict = {}
+
+    @staticmethod
+    def _parse_resolution(resolution) -> dict:
+        """Normalise the resolution argument to {phase: stride}."""
+        if resolution is None:
+            return {}
+        if not isinstance(resolution, dict):
+            resolution = {"default": resolution}
+        strides = {}
+        for phase, stride in resolution.items():
+            if int(stride) != stride or stride < 1:
+                raise ValueError(
+                    f"resolution stride for {phase!r} must be a positive int, "
+                    f"got {stride!r}"
+                )
+            strides[phase] = int(stride)
+        return strides
+
+    def _stride(self, phase: str) -> int:
+        return self._strides.get(phase, self._strides.get("default", 1))
 
     # ------------------------------------------------------------------
     # Low-level helpers
@@ -108,44 +336,447 @@ class ProtocolSimulator:
             return _build_Q_11state(self.params, V)
         return self.model.build_Q(V)
 
-    def _simulate(self, voltage_func: Callable) -> Tuple[np.ndarray, np.ndarray]:
+    def _sparse_Q(self, V: float):
+        """Q(V) as a CSC matrix, cached per voltage (linalg="krylov")."""
+
+        def build():
+            if hasattr(self.model, "build_Q_sparse"):
+                return self.model.build_Q_sparse(V)
+            return sparse.csc_matrix(self._build_Q(V))
+
+        return self._cached("sparse", V, 0, build)
+
+    def _start_state(self, proto) -> np.ndarray:
+        """Initial state of *proto*: s0, or the equilibrium at its holding voltage."""
+        if not self.steady:
+            return self.s0
+        V = float(proto.cfg.v_hold)
+        return self._cached(
+            "steady", V, 0, lambda: stationary_distribution(self._build_Q(V))
+        )
+
+    def _cached(self, kind: str, V: float, n_steps: int, build: Callable):
+        """Look up / build a Q(V)-derived matrix in the shared LRU cache."""
+        key = (kind, self._param_digest, self._model_key, V, self.dt, n_steps)
+        return _MATRIX_CACHE.get(key, build)
+
+    def _feed(self, reducers: list, k_first: int, states: np.ndarray) -> None:
+        """Pass a contiguous block of states (first index *k_first*) to reducers."""
+        open_probs = states[:, self._open_idx].sum(axis=1)
+        for r in reducers:
+            r.update(k_first, open_probs, states)
+
+    def _simulate(
+        self, voltage_func: Callable, reducers: list = None, P0: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """Step-wise matrix-exponential propagation: P(t+dt) = expm(Q(V)·dt) @ P(t).
 
-        expm(Q(V)·dt) is cached per unique voltage value.  All four protocols are
-        piecewise-constant (2-4 voltage levels per run), so only 2-4 expm calls are
-        needed instead of one per timestep.
+        expm(Q(V)·dt) is taken from the shared matrix cache per unique voltage
+        value.  All four protocols are piecewise-constant (2-4 voltage levels per
+        run), so only 2-4 expm calls are needed instead of one per timestep.
+
+        Without *reducers* the full ``(len(t), n_states)`` state matrix is
+        returned.  With reducers, states are streamed to them in blocks of
+        _BLOCK rows and ``(t, None)`` is returned.  The walk starts from *P0*
+        (default s0).
         """
         t = self._time_array()
-        dt = self.dt
-        P = self.s0.copy()
-        states = np.zeros((len(t), len(P)))
+        P = (self.s0 if P0 is None else P0).copy()
+        rows = len(t) if reducers is None else self._BLOCK
+        states = np.zeros((rows, len(P)))
         states[0] = P
+        k_first = 0  # grid index of states[0]
 
-        _expm_cache: dict = {}
         prev_V = None
         mat = None
 
         for k in range(1, len(t)):
             V = voltage_func(t[k - 1])
             if V != prev_V:
-                if V not in _expm_cache:
-                    _expm_cache[V] = _matrix_expm(self._build_Q(V) * dt)
-                mat = _expm_cache[V]
+                mat = self._jump_matrix(V, 1)
                 prev_V = V
             P = mat @ P
-            states[k] = P
-        return t, states
+            if k - k_first == rows:
+                self._feed(reducers, k_first, states)
+                k_first = k
+            states[k - k_first] = P
+
+        if reducers is None:
+            return t, states
+        self._feed(reducers, k_first, states[: len(t) - k_first])
+        return t, None
 
     def _idx(self, t_sec: float) -> int:
         return int(round(t_sec / self.dt))
 
-    def _peak_open(self, states: np.ndarray, i_start: int, i_end: int) -> float:
-        """Peak total open-state probability in the window [i_start, i_end)."""
-        open_prob = states[i_start:i_end, self._open_idx].sum(axis=1)
-        return float(np.max(open_prob))
+    # ------------------------------------------------------------------
+    # Segment engine
+    # ------------------------------------------------------------------
+
+    def _n_steps(self) -> int:
+        # len(_time_array()) - 1, without building the array
+        return int(np.ceil((self.t_total + self.dt) / self.dt)) - 1
+
+    def _step_segments(self, segments: list) -> List[Tuple[int, int, float, int]]:
+        """Convert protocol Segments (seconds) into (k0, k1, V, stride) step ranges.
+
+        Steps k0+1 … k1 (i.e. states k0 → k1) are taken at voltage V; stride
+        is the sampling stride of the segment's phase.  The last segment is
+        extended to the end of the grid.
+        """
+        n = self._n_steps()
+        steps = []
+        for j, seg in enumerate(segments):
+            k0 = min(self._idx(seg.t_start), n)
+            k1 = n if j == len(segments) - 1 else min(self._idx(seg.t_end), n)
+            if k1 > k0:
+                steps.append((k0, k1, float(seg.voltage), self._stride(seg.phase)))
+        return steps
+
+    def _jump_matrix(self, V: float, n_steps: int) -> np.ndarray:
+        """expm(Q(V) · n_steps · dt), cached per (V, n_steps)."""
+        return self._cached(
+            "expm",
+            V,
+            n_steps,
+            lambda: _matrix_expm(self._build_Q(V) * (n_steps * self.dt)),
+        )
+
+    def _step_powers(self, V: float, stride: int = 1) -> np.ndarray:
+        """Stack [M, M², …, M^B] for the stride-step matrix M at voltage V."""
+
+        def build():
+            M = self._jump_matrix(V, stride)
+            powers = M[None]
+            while len(powers) < self._BLOCK:
+                powers = np.concatenate([powers, powers @ powers[-1]])
+            return powers[: self._BLOCK]
+
+        return self._cached("powers", V, stride, build)
+
+    def _pow2(self, V: float) -> np.ndarray:
+        """Stack [M, M², M⁴, …] of the one-step matrix M at voltage V.
+
+        Deep enough for any jump on the grid: entry i is M^(2^i) for
+        i < bit_length(n_steps).
+        """
+        levels = max(self._n_steps().bit_length(), 1)
+
+        def build():
+            mats = [self._jump_matrix(V, 1)]
+            while len(mats) < levels:
+                mats.append(mats[-1] @ mats[-1])
+            return np.stack(mats)
+
+        return self._cached("pow2", V, levels, build)
+
+    def _jump_columns(self, P: np.ndarray, V: float, lengths: np.ndarray) -> np.ndarray:
+        """Advance column j of P (n_states, S) by lengths[j] dt steps at V.
+
+        Binary exponentiation: M^k P is the product of M^(2^i) over the set
+        bits i of k, so a jump of any length costs at most bit_length(k)
+        products and no new expm.  All columns with bit i set share one GEMM.
+        """
+        lengths = np.asarray(lengths, dtype=np.int64)
+        out = P.copy()
+        if not lengths.any():
+            return out
+        if self.linalg == "krylov":
+            A = self._sparse_Q(V) * self.dt
+            for L in np.unique(lengths[lengths > 0]):
+                cols = np.flatnonzero(lengths == L)
+                out[:, cols] = expm_multiply(A * float(L), P[:, cols])
+            return out
+        pow2 = self._pow2(V)
+        for i in range(int(lengths.max()).bit_length()):
+            cols = np.flatnonzero((lengths >> i) & 1)
+            if len(cols):
+                out[:, cols] = pow2[i] @ out[:, cols]
+        return out
+
+    def _jump_state(self, P: np.ndarray, V: float, k: int) -> np.ndarray:
+        """Single state vector P advanced by k dt steps at V."""
+        return self._jump_columns(P[:, None], V, np.array([k]))[:, 0]
+
+    def _sample_columns(
+        self,
+        P: np.ndarray,
+        V: float,
+        n: np.ndarray,
+        k_first: np.ndarray,
+        feeds: list,
+        stride: int = 1,
+    ) -> np.ndarray:
+        """Walk column j of P (n_states, S) n[j] strides at V as one block.
+
+        States are streamed to feeds[j] (a reducer list) with grid indices
+        k_first[j], k_first[j]+stride, …  (n[j] of them).  Each substep is a
+        single (n_states × n_states) · (n_states × S) product (one
+        expm_multiply over the block for linalg="krylov"); columns drop out
+        of the block as soon as their own window is exhausted.
+        """
+        P = P.copy()
+        done = 0
+        while True:
+            active = np.flatnonzero(n > done)
+            if len(active) == 0:
+                return P
+            b = min(self._BLOCK, int(n[active].max()) - done)
+            block = self._block_states(P[:, active], V, b, stride)
+            open_probs = block[:, self._open_idx, :].sum(axis=1)  # (b, S_active)
+            for c, j in enumerate(active):
+                m = min(b, int(n[j]) - done)
+                for r in feeds[j]:
+                    r.update(
+                        k_first[j] + done * stride,
+                        open_probs[:m, c],
+                        block[:m, :, c],
+                        stride,
+                    )
+                P[:, j] = block[m - 1, :, c]
+            done += b
+
+    def _block_states(self, P: np.ndarray, V: float, b: int, stride: int) -> np.ndarray:
+        """(b, n_states, S) states 1…b strides after the columns of P."""
+        if self.linalg == "krylov":
+            h = stride * self.dt
+            if b == 1:
+                return expm_multiply(self._sparse_Q(V) * h, P)[None]
+            return expm_multiply(
+                self._sparse_Q(V), P, start=h, stop=b * h, num=b, endpoint=True
+            )
+        return self._step_powers(V, stride)[:b] @ P
+
+    def _eigen(self, V: float) -> EigenPropagator:
+        """Eigendecomposition of Q(V), cached per voltage."""
+        return self._cached("eig", V, 0, lambda: EigenPropagator(self._build_Q(V)))
+
+    def _advance_eig(
+        self, P: np.ndarray, V: float, nodes: list, n_total: int
+    ) -> np.ndarray:
+        """Closed-form counterpart of _advance (propagator="eig").
 
-    def _open_at(self, states: np.ndarray, i: int) -> float:
-        return float(states[i, self._open_idx].sum())
+        Window extrema are taken over continuous time between the window's
+        first and last grid point; single-index windows get the exact state.
+        """
+        prop = self._eigen(V)
+        u = np.zeros(len(self.s0))
+        u[self._open_idx] = 1.0
+        out = np.empty_like(P)
+        for j, nd in enumerate(nodes):
+            k0, k1 = nd.segment[:2]
+            P0 = P[:, j]
+            crit = None
+            for r in nd.reducers:
+                a, b = r.window(n_total)
+                a2, b2 = max(a, k0 + 1), min(b - 1, k1)
+                if a2 > b2:
+                    continue
+                if crit is None:
+                    crit = prop.critical_times(P0, u, (k1 - k0) * self.dt)
+                inner = crit[
+                    (crit > (a2 - k0) * self.dt) & (crit < (b2 - k0) * self.dt)
+                ]
+                idx = np.concatenate([[a2, b2], k0 + inner / self.dt])
+                states = prop.state(P0, (idx - k0) * self.dt)
+                for i, state in zip(idx, states):
+                    r.offer(i, state @ u, state)
+            out[:, j] = prop.state(P0, (k1 - k0) * self.dt)
+        return out
+
+    def _refine_window(self, r, P: np.ndarray, V: float, a: int, b: int) -> None:
+        """Coarse-to-fine search of reducer *r* over grid indices [a, b].
+
+        P is the state at index a.  The window is sampled every s = 2^l
+        steps (about _N_COARSE points, plus b); the best sample is then
+        bracketed by its lattice neighbours and the bracket is bisected
+        until it is one dt step wide on each side.
+        """
+        a, b = int(a), int(b)
+        level = ((b - a) // self._N_COARSE).bit_length()
+        s = 1 << level
+        ks, states = [a], [P]
+        if b > a:
+            while ks[-1] + s <= b:
+                states.append(self._jump_state(states[-1], V, s))
+                ks.append(ks[-1] + s)
+            if ks[-1] < b:
+                states.append(self._jump_state(states[-1], V, b - ks[-1]))
+                ks.append(b)
+        S = np.array(states)
+        open_probs = S[:, self._open_idx].sum(axis=1)
+        for k, p, state in zip(ks, open_probs, S):
+            r.offer(k, p, state)
+
+        i = r.best(open_probs)
+        kB, PB, vB = ks[i], S[i], open_probs[i]
+        kL, PL = (ks[i - 1], S[i - 1]) if i > 0 else (kB, PB)
+        kR = ks[i + 1] if i + 1 < len(ks) else kB
+        while kB - kL > 1 or kR - kB > 1:
+            cands = []
+            if kB - kL > 1:
+                m = (kB - kL) // 2
+                cands.append((kL + m, self._jump_state(PL, V, m)))
+            if kR - kB > 1:
+                m = (kR - kB) // 2
+                cands.append((kB + m, self._jump_state(PB, V, m)))
+            vals = [vB]
+            for k, state in cands:
+                vals.append(float(state[self._open_idx].sum()))
+                r.offer(k, vals[-1], state)
+            j = r.best(np.array(vals))
+            if j == 0:
+                for k, state in cands:
+                    if k < kB:
+                        kL, PL = k, state
+                    else:
+                        kR = k
+            elif cands[j - 1][0] < kB:
+                kR = kB
+                (kB, PB), vB = cands[j - 1], vals[j]
+            else:
+                kL, PL = kB, PB
+                (kB, PB), vB = cands[j - 1], vals[j]
+
+    def _advance_refine(
+        self, P: np.ndarray, V: float, nodes: list, n_total: int
+    ) -> np.ndarray:
+        """Hierarchical counterpart of _advance (propagator="refine").
+
+        Every window costs O(_N_COARSE + log² w) small products instead of w.
+        The result is exact on the dt grid when the observable has a single
+        extremum within one coarse cell of the best lattice point.
+        """
+        k0 = np.array([nd.segment[0] for nd in nodes])
+        k1 = np.array([nd.segment[1] for nd in nodes])
+        for j, nd in enumerate(nodes):
+            for r in nd.reducers:
+                a, b = r.window(n_total)
+                a2, b2 = max(a, k0[j] + 1), min(b - 1, k1[j])
+                if a2 <= b2:
+                    start = self._jump_state(P[:, j], V, a2 - k0[j])
+                    self._refine_window(r, start, V, a2, b2)
+        return self._jump_columns(P, V, k1 - k0)
+
+    def _advance(self, P: np.ndarray, V: float, nodes: list, n_total: int):
+        """Propagate the columns of P (n_states, S) through the segments of *nodes*.
+
+        All nodes share the voltage V and sampling stride s.  For node j with
+        segment (k0, k1, V, s), states k0+1 … k1 are produced; the hull
+        [lo, hi] of those any of its reducers needs is sampled at lo, lo+s, …
+        and hi, the rest is jumped.
+        """
+        if self.propagator == "eig" and self._eigen(V).ok:
+            return self._advance_eig(P, V, nodes, n_total)
+        if self.propagator == "refine":
+            return self._advance_refine(P, V, nodes, n_total)
+        k0 = np.array([nd.segment[0] for nd in nodes])
+        k1 = np.array([nd.segment[1] for nd in nodes])
+        lo, hi = k1 + 1, k0.copy()  # empty hull by default
+        for j, nd in enumerate(nodes):
+            for r in nd.reducers:
+                a, b = r.window(n_total)
+                a2, b2 = max(a, k0[j] + 1), min(b - 1, k1[j])
+                if a2 <= b2:
+                    lo[j], hi[j] = min(lo[j], a2), max(hi[j], b2)
+
+        sampled = hi >= lo
+        if not sampled.any():
+            return self._jump_columns(P, V, k1 - k0)
+        stride = nodes[0].segment[3]
+        if stride == 1:
+            P = self._jump_columns(P, V, np.where(sampled, lo - 1 - k0, k1 - k0))
+            cols = np.flatnonzero(sampled)
+            P[:, cols] = self._sample_columns(
+                P[:, cols],
+                V,
+                (hi - lo + 1)[cols],
+                lo[cols],
+                [nodes[j].reducers for j in cols],
+            )
+            return self._jump_columns(P, V, np.where(sampled, k1 - hi, 0))
+
+        # strided lattice lo, lo+s, …, closed on hi so window ends are seen
+        P = self._jump_columns(P, V, np.where(sampled, lo - k0, k1 - k0))
+        cols = np.flatnonzero(sampled)
+        for j in cols:
+            self._feed(nodes[j].reducers, lo[j], P[:, j][None])
+        m = np.where(sampled, (hi - lo) // stride, 0)
+        P[:, cols] = self._sample_columns(
+            P[:, cols],
+            V,
+            m[cols],
+            (lo + stride)[cols],
+            [nodes[j].reducers for j in cols],
+            stride,
+        )
+        rest = np.where(sampled, hi - lo - m * stride, 0)
+        P = self._jump_columns(P, V, rest)
+        for j in np.flatnonzero(rest > 0):
+            self._feed(nodes[j].reducers, hi[j], P[:, j][None])
+        return self._jump_columns(P, V, np.where(sampled, k1 - hi, 0))
+
+    def _simulate_segments(self, sweeps: list, P0: np.ndarray = None) -> None:
+        """Exact segment-level propagation of several sweeps sharing prefixes.
+
+        Parameters
+        ----------
+        sweeps : list of (steps, reducers) — steps from _step_segments, and
+            the reducers (updated in place) observing that sweep.
+
+        The sweeps are merged into a prefix tree of segments, so a segment
+        common to several sweeps (e.g. the holding phase) is propagated and
+        sampled once, feeding the reducers of every sweep below it.  The tree
+        is walked level by level; nodes of one level at the same voltage are
+        advanced together as an (n_states, n_nodes) matrix.  Every sweep
+        starts from *P0* (default s0).
+        """
+        n_total = max(steps[-1][1] for steps, _ in sweeps)
+        root = _SweepNode(None)
+        for steps, reducers in sweeps:
+            node = root
+            node.reducers.extend(reducers)
+            for seg in steps:
+                node = node.children.setdefault(seg, _SweepNode(seg))
+                node.reducers.extend(reducers)
+
+        P0 = self.s0 if P0 is None else P0
+        self._feed(root.reducers, 0, P0[None])
+        frontier = [(child, P0) for child in root.children.values()]
+        while frontier:
+            groups: dict = {}
+            for node, P in frontier:
+                groups.setdefault(node.segment[2:], []).append((node, P))
+            frontier = []
+            for (V, _), items in groups.items():
+                nodes = [node for node, _ in items]
+                P = np.stack([P for _, P in items], axis=1)
+                P = self._advance(P, V, nodes, n_total)
+                for j, node in enumerate(nodes):
+                    frontier.extend(
+                        (child, P[:, j]) for child in node.children.values()
+                    )
+
+    def _run_sweeps(self, proto, xs, reducer_lists: list) -> None:
+        """Run every sweep x of *proto*, updating its reducers in place."""
+        P0 = self._start_state(proto)
+        if self.mode == "grid":
+            for x, reducers in zip(xs, reducer_lists):
+                self._simulate(proto.get_voltage_function(x), reducers, P0)
+            return
+        sweeps = [
+            (self._step_segments(proto.get_segments(x, self.t_total)), reducers)
+            for x, reducers in zip(xs, reducer_lists)
+        ]
+        self._simulate_segments(sweeps, P0)
+
+    @staticmethod
+    def _quotient_error(num, e_num, den, e_den):
+        """First-order error bound of num / den from the errors of both."""
+        num, den = np.asarray(num, dtype=float), np.asarray(den, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            err = np.abs(e_num / den) + np.abs(num * e_den / den**2)
+        return np.where(den != 0, err, 0.0)
 
     # ------------------------------------------------------------------
     # Protocol runners — return normalised arrays
@@ -159,13 +790,23 @@ class ProtocolSimulator:
         i0 = self._idx(proto.t_pulse_start)
         i1 = self._idx(proto.t_pulse_end)
 
+        peaks = [WindowMax(i0, i1) for _ in test_voltages]
+        self._run_sweeps(proto, test_voltages, [[pk] for pk in peaks])
+
         conductances = np.zeros(len(test_voltages))
-        for i, V in enumerate(test_voltages):
-            _, states = self._simulate(proto.get_voltage_function(V))
-            conductances[i] = self.g_k_max * self._peak_open(states, i0, i1)
+        for i, peak in enumerate(peaks):
+            conductances[i] = self.g_k_max * peak.value
+        err = self.g_k_max * np.array([peak.error for peak in peaks])
 
         mx = np.max(conductances)
-        return conductances / mx if mx > 0 else conductances
+        if mx > 0:
+            i_mx = int(np.argmax(conductances))
+            self.errors["activation"] = self._quotient_error(
+                conductances, err, mx, err[i_mx]
+            )
+            return conductances / mx
+        self.errors["activation"] = err
+        return conductances
 
     def run_inactivation(self, test_voltages: np.ndarray = None) -> np.ndarray:
         proto = self.inact_proto
@@ -176,16 +817,25 @@ class ProtocolSimulator:
         v_hold = proto.cfg.v_hold
         i_test = self._idx(proto.t_test_start)
 
+        obs = [(ValueAt(i_test - 1), WindowMax(i_test)) for _ in test_voltages]
+        self._run_sweeps(proto, test_voltages, obs)
+
         currents = np.zeros(len(test_voltages))
-        for i, V in enumerate(test_voltages):
-            _, states = self._simulate(proto.get_voltage_function(V))
-            baseline = self._open_at(states, i_test - 1)
-            peak = float(np.max(states[i_test:, self._open_idx].sum(axis=1)))
-            g = self.g_k_max * (peak - baseline)
+        err = np.zeros(len(test_voltages))
+        for i, (baseline, peak) in enumerate(obs):
+            g = self.g_k_max * (peak.value - baseline.value)
             currents[i] = g * (v_depo - v_hold)
+            err[i] = self.g_k_max * (peak.error + baseline.error) * abs(v_depo - v_hold)
 
         mx = np.max(currents)
-        return currents / mx if mx > 0 else currents
+        if mx > 0:
+            i_mx = int(np.argmax(currents))
+            self.errors["inactivation"] = self._quotient_error(
+                currents, err, mx, err[i_mx]
+            )
+            return currents / mx
+        self.errors["inactivation"] = err
+        return currents
 
     def run_cs_inactivation(self, test_times: np.ndarray = None) -> np.ndarray:
         proto = self.csi_proto
@@ -196,21 +846,35 @@ class ProtocolSimulator:
         v_depo = proto.cfg.v_depo
         v_prep = proto.cfg.v_prep
 
+        obs = [(WindowMax(0, i_prep + 1), WindowMax(self._idx(t))) for t in test_times]
+        self._run_sweeps(proto, test_times, obs)
+
         currents = np.zeros(len(test_times))
-        for i, t_pulse in enumerate(test_times):
-            _, states = self._simulate(proto.get_voltage_function(t_pulse))
-            i_pulse = self._idx(t_pulse)
-            baseline_max = float(
-                np.max(states[0 : i_prep + 1, self._open_idx].sum(axis=1))
-            )
+        err = np.zeros(len(test_times))
+        for i, (initial, after) in enumerate(obs):
+            baseline_max = initial.value
             if baseline_max == 0:
                 baseline_max = 1e-12
-            peak_after = float(np.max(states[i_pulse:, self._open_idx].sum(axis=1)))
+            peak_after = after.value
             g = self.g_k_max * peak_after / baseline_max
             currents[i] = g * (v_depo - v_prep)
+            err[i] = (
+                self.g_k_max
+                * abs(v_depo - v_prep)
+                * self._quotient_error(
+                    peak_after, after.error, baseline_max, initial.error
+                )
+            )
 
         mx = np.max(currents)
-        return currents / mx if mx > 0 else currents
+        if mx > 0:
+            i_mx = int(np.argmax(currents))
+            self.errors["cs_inactivation"] = self._quotient_error(
+                currents, err, mx, err[i_mx]
+            )
+            return currents / mx
+        self.errors["cs_inactivation"] = err
+        return currents
 
     def run_recovery(self, test_times: np.ndarray = None) -> np.ndarray:
         proto = self.rec_proto
@@ -222,15 +886,24 @@ class ProtocolSimulator:
         i_pre_end = self._idx(cfg.t_pulse)
         v_depo, v_hold = cfg.v_depo, cfg.v_hold
 
+        obs = [
+            (WindowMax(i_pre_start, i_pre_end), WindowMax(self._idx(t)))
+            for t in test_times
+        ]
+        self._run_sweeps(proto, test_times, obs)
+
         ratios = np.zeros(len(test_times))
-        for i, t_rec_end in enumerate(test_times):
-            _, states = self._simulate(proto.get_voltage_function(t_rec_end))
-            g_pre = self.g_k_max * self._peak_open(states, i_pre_start, i_pre_end)
-            g_test = self.g_k_max * float(
-                np.max(states[self._idx(t_rec_end) :, self._open_idx].sum(axis=1))
-            )
+        err = np.zeros(len(test_times))
+        for i, (pre, test) in enumerate(obs):
+            g_pre = self.g_k_max * pre.value
+            g_test = self.g_k_max * test.value
             I_pre = g_pre * (v_depo - v_hold)
             I_test = g_test * (v_depo - v_hold)
             ratios[i] = I_test / I_pre if I_pre > 0 else 0.0
+            if I_pre > 0:
+                err[i] = self._quotient_error(
+                    test.value, test.error, pre.value, pre.error
+                )
 
+        self.errors["recovery"] = err
         return ratios
@@ -0,0 +1,31 @@
+"""
+Stationary distribution of a generator matrix.
+
+For an irreducible Markov model the equilibrium p at a fixed voltage solves
+
+    Q p = 0,   Σ p = 1
+
+Q has rank n-1 (its columns sum to zero), so one row of the singular
+system is redundant; replacing it by the normalisation row gives a regular
+n × n linear system.  Starting a protocol from this p is equivalent to an
+infinitely long holding phase at that voltage.
+"""
+
+import numpy as np
+
+
+def stationary_distribution(Q: np.ndarray) -> np.ndarray:
+    """
+    Stationary distribution of Q (n, n), or of a stack of generators (..., n, n).
+
+    Q[j, i] = rate(i→j).  Returns p of shape (n,) / (..., n) with Q p = 0 and
+    Σ p = 1; round-off negatives are clipped and p is renormalised.
+    """
+    Q = np.asarray(Q, dtype=float)
+    A = Q.copy()
+    A[..., -1, :] = 1.0
+    b = np.zeros(Q.shape[:-1])
+    b[..., -1] = 1.0
+    p = np.linalg.solve(A, b[..., None])[..., 0]
+    p = np.clip(p, 0.0, None)
+    return p / p.sum(axis=-1, keepdims=True)
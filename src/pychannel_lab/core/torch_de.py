@@ -34,10 +34,14 @@ from core.protocols import (
     RecoveryProtocol,
 )
 from core.torch_simulator import (
+    KRYLOV_MIN_STATES,
+    _ScatterBasis,
     _get_basis_11,
     _precompute_dynamic_basis,
+    krylov_expm_multiply,
     get_device,
     preferred_dtype,
+    torch_stationary_distribution,
 )
 from core.torch_optimizer import (
     OptimizeResult,
@@ -128,7 +132,8 @@ def build_Q_dynamic_batch(
     params : (P, n_params)
     V      : float
     msm_def : MSMDefinition
-    basis  : (n_transitions, n_states, n_states) — precomputed constant basis
+    basis  : (n_transitions, n_states, n_states) — precomputed constant basis,
+             or a _ScatterBasis for large models
 
     Returns
     -------
@@ -162,6 +167,8 @@ def build_Q_dynamic_batch(
         rate_list.append(r)
 
     rates = torch.stack(rate_list, dim=1)  # (P, T)
+    if isinstance(basis, _ScatterBasis):
+        return basis.apply(rates)
     return torch.einsum("pt,tij->pij", rates, basis.to(device=device, dtype=dtype))
 
 
@@ -230,8 +237,17 @@ class BatchedProtocolSimulator:
     params    : (P, n_full_params) — one parameter set per member (fully expanded)
     t_total   : float              — total simulation time (s), needed for
                                      inactivation test-pulse duration and recovery.
+    initial_state : array-like or "steady" — "steady" starts every protocol
+                    from the per-member stationary distribution of Q(v_hold)
+                    (one batched linear solve instead of a batched matrix_exp).
+    linalg    : {"auto", "dense", "krylov"} — "krylov" replaces the batched
+                matrix_exp by batched Arnoldi (krylov_expm_multiply); "auto"
+                selects it from KRYLOV_MIN_STATES states.  Resolved choice in
+                the ``linalg`` attribute.
     """
 
+    _LINALG = ("auto", "dense", "krylov")
+
     def __init__(
         self,
         params: torch.Tensor,
@@ -244,7 +260,10 @@ class BatchedProtocolSimulator:
         t_total: float = 3.0,
         n_peak_steps: int = 50,
         initial_state=None,
+        linalg: str = "auto",
     ):
+        if linalg not in self._LINALG:
+            raise ValueError(f"linalg must be one of {self._LINALG}, got {linalg!r}")
         self.params = params
         self.P = params.shape[0]
         self.device = params.device
@@ -253,6 +272,14 @@ class BatchedProtocolSimulator:
         self.t_total = t_total
         self.n_peak_steps = n_peak_steps
         self.msm_def = msm_def
+        self.steady = isinstance(initial_state, str)
+        if self.steady:
+            if initial_state != "steady":
+                raise ValueError(
+                    f"initial_state must be an array or 'steady', got {initial_state!r}"
+                )
+            initial_state = None
+        self._steady_cache: dict = {}
 
         if msm_def is not None:
             self._open_idx = msm_def.open_state_indices
@@ -273,6 +300,9 @@ class BatchedProtocolSimulator:
 
         s0_t = torch.tensor(s0, dtype=self.dtype, device=self.device)
         self.s0 = s0_t.unsqueeze(0).expand(self.P, -1).clone()  # (P, n_states)
+        if linalg == "auto":
+            linalg = "krylov" if len(s0) >= KRYLOV_MIN_STATES else "dense"
+        self.linalg = linalg
 
         self.act_proto = ActivationProtocol(act_cfg)
         self.inact_proto = InactivationProtocol(inact_cfg)
@@ -295,6 +325,8 @@ class BatchedProtocolSimulator:
 
     def _prop(self, P_batch: torch.Tensor, V: float, dt: float) -> torch.Tensor:
         """Exact one-shot propagation. P_batch: (P, n) → (P, n)."""
+        if self.linalg == "krylov":
+            return krylov_expm_multiply(self._Q_batch(V), P_batch, dt)
         M = self._expm_batch(self._Q_batch(V) * dt)  # (P, n, n)
         return torch.bmm(M, P_batch.unsqueeze(-1)).squeeze(-1)
 
@@ -304,34 +336,55 @@ class BatchedProtocolSimulator:
         """
         Propagate with n_peak_steps substeps, tracking peak open probability.
 
+        P_batch may be (P, n_states) or (P, n_states, S); in the latter case
+        the S sweeps of each member are advanced together by one bmm.
+
         Returns
         -------
-        P_final : (P, n_states)
-        peak    : (P,)  — max open probability over all substeps
+        P_final : same shape as P_batch
+        peak    : (P,) or (P, S) — max open probability over all substeps
         """
         n = self.n_peak_steps
         dt_sub = total_dt / n
-        M = self._expm_batch(self._Q_batch(V) * dt_sub)  # (P, n, n) — computed once
+        krylov = self.linalg == "krylov"
+        Q = self._Q_batch(V)
+        M = None if krylov else self._expm_batch(Q * dt_sub)  # (P, n, n) — once
 
-        open_probs = [P_batch[:, self._open_idx].sum(dim=1)]  # initial
-        cur = P_batch
+        vector = P_batch.dim() == 2
+        cur = P_batch.unsqueeze(-1) if vector else P_batch  # (P, n, S)
+        open_probs = [self._open(cur)]  # initial
         for _ in range(n):
-            cur = torch.bmm(M, cur.unsqueeze(-1)).squeeze(-1)
-            open_probs.append(cur[:, self._open_idx].sum(dim=1))
+            cur = krylov_expm_multiply(Q, cur, dt_sub) if krylov else torch.bmm(M, cur)
+            open_probs.append(self._open(cur))
 
-        peak = torch.stack(open_probs, dim=0).max(dim=0).values  # (P,)
+        peak = torch.stack(open_probs, dim=0).max(dim=0).values  # (P, S)
+        if vector:
+            return cur.squeeze(-1), peak.squeeze(-1)
         return cur, peak
 
     def _open(self, P_batch: torch.Tensor) -> torch.Tensor:
-        """(P,) — total open probability for each member."""
+        """(P,) or (P, S) — total open probability for each member."""
         return P_batch[:, self._open_idx].sum(dim=1)
 
+    def _equilibrium(self, V: float) -> torch.Tensor:
+        """(P, n) stationary distributions of Q(V), one batched solve per voltage."""
+        V = float(V)
+        if V not in self._steady_cache:
+            self._steady_cache[V] = torch_stationary_distribution(self._Q_batch(V))
+        return self._steady_cache[V]
+
+    def _hold(self, V: float, t_hold: float) -> torch.Tensor:
+        """(P, n) state after the holding phase: s0 propagated, or the equilibrium."""
+        if self.steady:
+            return self._equilibrium(V)
+        return self._prop(self.s0, V, t_hold)
+
     # ── per-protocol MSE losses ───────────────────────────────────────────────
 
     def activation_loss(self, x_data: np.ndarray, y_data: np.ndarray) -> torch.Tensor:
         """Weighted-normalised MSE for all P members. Returns (P,)."""
         cfg = self.act_proto.cfg
-        P_hold = self._prop(self.s0, cfg.v_hold, cfg.t_hold)
+        P_hold = self._hold(cfg.v_hold, cfg.t_hold)
 
         peaks = []
         for V in x_data.tolist():
@@ -347,17 +400,20 @@ class BatchedProtocolSimulator:
     def inactivation_loss(self, x_data: np.ndarray, y_data: np.ndarray) -> torch.Tensor:
         cfg = self.inact_proto.cfg
         t_test_dur = max(self.t_total - cfg.t_hold - cfg.t_cond, 1e-3)
-        P_hold = self._prop(self.s0, cfg.v_hold, cfg.t_hold)
-
-        currents = []
-        for V_cond in x_data.tolist():
-            P_cond = self._prop(P_hold, float(V_cond), cfg.t_cond)
-            baseline = self._open(P_cond)
-            _, peak = self._prop_peak(P_cond, cfg.v_depo, t_test_dur)
-            g = self.g_k_max * (peak - baseline)
-            currents.append(g * (cfg.v_depo - cfg.v_hold))
-
-        curr = torch.stack(currents, dim=0)  # (N_V, P)
+        P_hold = self._hold(cfg.v_hold, cfg.t_hold)
+
+        # Shared v_depo test pulse: advance all sweeps as (P, n_states, N_V)
+        P_cond = torch.stack(
+            [
+                self._prop(P_hold, float(V_cond), cfg.t_cond)
+                for V_cond in x_data.tolist()
+            ],
+            dim=2,
+        )
+        baseline = self._open(P_cond)  # (P, N_V)
+        _, peak = self._prop_peak(P_cond, cfg.v_depo, t_test_dur)  # (P, N_V)
+        g = self.g_k_max * (peak - baseline)
+        curr = (g * (cfg.v_depo - cfg.v_hold)).T  # (N_V, P)
         mx = curr.max(dim=0).values.clamp(min=1e-12)
         norm = curr / mx.unsqueeze(0)
         target = torch.tensor(y_data, dtype=self.dtype, device=self.device)
@@ -370,9 +426,13 @@ class BatchedProtocolSimulator:
         cfg = self.csi_proto.cfg
         t_initial = cfg.t_initial
 
-        _, baseline_peak = self._prop_peak(self.s0, cfg.v_hold, t_initial)
+        if self.steady:
+            P_after = self._equilibrium(cfg.v_hold)
+            baseline_peak = self._open(P_after)
+        else:
+            _, baseline_peak = self._prop_peak(self.s0, cfg.v_hold, t_initial)
+            P_after = self._prop(self.s0, cfg.v_hold, t_initial)
         baseline_peak = baseline_peak.clamp(min=1e-12)
-        P_after = self._prop(self.s0, cfg.v_hold, t_initial)
 
         currents = []
         for t_pulse in x_sim.tolist():
@@ -392,7 +452,7 @@ class BatchedProtocolSimulator:
     def recovery_loss(self, x_sim: np.ndarray, y_data: np.ndarray) -> torch.Tensor:
         """x_sim: absolute test-pulse start times in seconds."""
         cfg = self.rec_proto.cfg
-        P0 = self._prop(self.s0, cfg.v_hold, cfg.t_prep)
+        P0 = self._hold(cfg.v_hold, cfg.t_prep)
         P_inact, g_pre = self._prop_peak(P0, cfg.v_depo, cfg.t_pulse - cfg.t_prep)
         g_pre = g_pre.clamp(min=1e-12)
 
@@ -491,9 +551,11 @@ class TorchDEOptimizer:
         n_peak_steps: int = 50,
         device: torch.device = None,
         dtype: torch.dtype = None,
+        initial_state=None,
     ):
         self.exp = experimental_data
         self.w = weights or dict(self._DEFAULT_WEIGHTS)
+        self._initial_state = initial_state
         self._msm_def = msm_def
         self._act_cfg = act_cfg
         self._inact_cfg = inact_cfg
@@ -521,6 +583,7 @@ class TorchDEOptimizer:
             g_k_max=self._g_k_max,
             t_total=self._t_total,
             n_peak_steps=self._n_peak_steps,
+            initial_state=self._initial_state,
         )
         return sim.total_loss(self.exp, self.w, self._csi_cfg, self._rec_cfg)
 
@@ -622,6 +685,7 @@ class TorchPipelineOptimizer:
         n_peak_steps: int = 50,
         device: torch.device = None,
         dtype: torch.dtype = None,
+        initial_state=None,
     ):
         device = device or get_device()
         dtype = dtype or preferred_dtype(device)
@@ -639,6 +703,7 @@ class TorchPipelineOptimizer:
             n_peak_steps=n_peak_steps,
             device=device,
             dtype=dtype,
+            initial_state=initial_state,
         )
 
         self._de = TorchDEOptimizer(**_common)
@@ -657,6 +722,7 @@ class TorchPipelineOptimizer:
             n_peak_steps=n_peak_steps,
             device=device,
             dtype=dtype,
+            initial_state=initial_state,
         )
         self._torch_cost = TorchCostFunction(**_local_kw)
         self._local = TorchParameterOptimizer(self._torch_cost)
@@ -81,9 +81,11 @@ class TorchCostFunction:
         n_peak_steps: int = 50,
         device: torch.device = None,
         dtype: torch.dtype = None,
+        initial_state=None,
     ):
         self.exp = experimental_data
         self.w = weights or self._DEFAULT_WEIGHTS
+        self._initial_state = initial_state
         self._msm_def = msm_def
         self._act_cfg = act_cfg
         self._inact_cfg = inact_cfg
@@ -133,6 +135,7 @@ class TorchCostFunction:
             g_k_max=self._g_k_max,
             t_total=self._t_total,
             n_peak_steps=self._n_peak_steps,
+            initial_state=self._initial_state,
         )
 
     def __call__(self, params: torch.Tensor) -> torch.Tensor:
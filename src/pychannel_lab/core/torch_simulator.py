@@ -5,10 +5,15 @@ For each piecewise-constant voltage segment the exact solution is:
     P(t + dt) = expm(Q(V) · dt) @ P(t)
 
 No numerical integration error; fully differentiable w.r.t. parameters.
+
+For large topologies (KRYLOV_MIN_STATES states and up) the dense O(n³)
+matrix_exp is replaced by a batched Arnoldi approximation of its action on
+the state columns (krylov_expm_multiply), and Q is assembled by index
+scatter instead of a dense (n_transitions, n, n) basis.
 """
 
 import math
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import numpy as np
 import torch
@@ -28,6 +33,7 @@ from core.protocols import (
     CSInactivationProtocol,
     RecoveryProtocol,
 )
+from core.spectral import EigenPropagator
 
 
 def get_device() -> torch.device:
@@ -153,18 +159,55 @@ def build_Q_11state(params: torch.Tensor, V: float) -> torch.Tensor:
     return torch.einsum("t,tij->ij", rates, basis)  # (11, 11)
 
 
-def _precompute_dynamic_basis(msm_def, dtype: torch.dtype) -> tuple[torch.Tensor, dict]:
+# Above this many states Q is assembled by index scatter (_ScatterBasis)
+# rather than from a dense (n_transitions, n, n) basis.
+DENSE_BASIS_MAX_STATES = 64
+
+# Models with at least this many states use Krylov propagation when
+# linalg="auto"; KRYLOV_DIM is the Arnoldi subspace dimension.
+KRYLOV_MIN_STATES = 150
+KRYLOV_DIM = 30
+
+
+class _ScatterBasis(NamedTuple):
+    """
+    Sparse stand-in for the dense transition basis of a large model.
+
+    index holds, for every transition t, the flat position to·n + from of
+    +rate_t followed (in the second half) by from·n + from of −rate_t.
+    """
+
+    index: torch.Tensor  # (2 · n_transitions,) long
+    n_states: int
+
+    def apply(self, rates: torch.Tensor) -> torch.Tensor:
+        """(..., n_transitions) rates → (..., n_states, n_states) Q."""
+        n = self.n_states
+        values = torch.cat([rates, -rates], dim=-1)
+        flat = torch.zeros(
+            rates.shape[:-1] + (n * n,), dtype=rates.dtype, device=rates.device
+        )
+        flat = flat.index_add(-1, self.index.to(rates.device), values)
+        return flat.reshape(rates.shape[:-1] + (n, n))
+
+
+def _precompute_dynamic_basis(msm_def, dtype: torch.dtype) -> tuple:
     """
     Build constant basis matrices for a user-defined MSMDefinition.
 
     Returns
     -------
-    basis : Tensor shape (n_transitions, n_states, n_states)
+    basis : Tensor shape (n_transitions, n_states, n_states), or a
+            _ScatterBasis for models above DENSE_BASIS_MAX_STATES states
     state_idx : dict mapping state name → column index
     """
     n = msm_def.n_states
     state_idx = {s: i for i, s in enumerate(msm_def.state_names)}
     T = len(msm_def.transitions)
+    if n > DENSE_BASIS_MAX_STATES:
+        fr = torch.tensor([state_idx[tr.from_state] for tr in msm_def.transitions])
+        to = torch.tensor([state_idx[tr.to_state] for tr in msm_def.transitions])
+        return _ScatterBasis(torch.cat([to * n + fr, fr * n + fr]), n), state_idx
     basis = torch.zeros(T, n, n, dtype=dtype)
     for t, tr in enumerate(msm_def.transitions):
         fr = state_idx[tr.from_state]
@@ -211,9 +254,89 @@ def build_Q_dynamic(
         rate_list.append(r)
 
     rates = torch.stack(rate_list)  # vectorize the list of rates
+    if isinstance(basis, _ScatterBasis):
+        return basis.apply(rates)
     return torch.einsum("t,tij->ij", rates, basis.to(device=device))
 
 
+def krylov_expm_multiply(
+    Q: torch.Tensor, P: torch.Tensor, t, m: int = KRYLOV_DIM
+) -> torch.Tensor:
+    """
+    Differentiable expm(Q·t) @ P by Arnoldi projection, without forming expm.
+
+    Parameters
+    ----------
+    Q : (..., n, n) generator matrix or batch of them.
+    P : (..., n) state vectors or (..., n, S) state columns.
+    t : float or tensor broadcastable to the columns (e.g. (S,) — one time
+        per column).
+    m : Krylov subspace dimension (capped at n).
+
+    Every column gets its own Krylov space: with V_m an orthonormal basis
+    of span{P, QP, …, Q^(m-1)P} and H_m = V_mᵀ Q V_m, the action is
+    ‖P‖ V_m expm(t H_m) e₁.  The interval is split into equal substeps with
+    t·‖Q‖₁ ≤ m each, which keeps the projection error near round-off
+    for stiff generators.  Cost is O(m · n² · S) per substep.
+    """
+    vector = P.dim() == Q.dim() - 1
+    X = P.unsqueeze(-1) if vector else P  # (..., n, S)
+    t = torch.as_tensor(t, dtype=X.dtype, device=X.device)
+    t = torch.broadcast_to(t, X.shape[:-2] + X.shape[-1:])  # (..., S)
+
+    norm = Q.detach().abs().sum(dim=-2).amax(dim=-1)  # (...,) ‖Q‖₁
+    stiff = float((t.detach().abs() * norm.unsqueeze(-1)).max())
+    n_sub = max(1, math.ceil(stiff / m))
+    h = t / n_sub
+    for _ in range(n_sub):
+        X = _arnoldi_expm_step(Q, X, h, min(m, Q.shape[-1]))
+    return X.squeeze(-1) if vector else X
+
+
+def _arnoldi_expm_step(Q: torch.Tensor, X: torch.Tensor, h: torch.Tensor, m: int):
+    """One Krylov substep of krylov_expm_multiply: X (..., n, S) → expm(Q h) X."""
+    tiny = torch.finfo(X.dtype).eps
+    beta = X.norm(dim=-2)  # (..., S)
+    basis = [X / beta.clamp(min=tiny).unsqueeze(-2)]
+    H = X.new_zeros(X.shape[:-2] + X.shape[-1:] + (m, m))  # (..., S, m, m)
+    for j in range(m):
+        w = Q @ basis[j]
+        for i in range(j + 1):
+            hij = (basis[i] * w).sum(dim=-2)
+            H[..., i, j] = hij
+            w = w - hij.unsqueeze(-2) * basis[i]
+        if j + 1 == m:
+            break
+        h_next = w.norm(dim=-2)
+        # happy breakdown: the Krylov space is invariant, continue with zeros
+        alive = h_next > tiny * beta
+        H[..., j + 1, j] = torch.where(alive, h_next, torch.zeros_like(h_next))
+        basis.append(
+            torch.where(
+                alive.unsqueeze(-2),
+                w / h_next.clamp(min=tiny).unsqueeze(-2),
+                torch.zeros_like(w),
+            )
+        )
+    E = torch.linalg.matrix_exp(H * h.unsqueeze(-1).unsqueeze(-1))  # (..., S, m, m)
+    coeff = beta.unsqueeze(-1) * E[..., :, 0]  # (..., S, m)
+    return (torch.stack(basis, dim=-1) * coeff.unsqueeze(-3)).sum(dim=-1)
+
+
+def torch_stationary_distribution(Q: torch.Tensor) -> torch.Tensor:
+    """
+    Differentiable stationary distribution of Q (n, n) or a batch (..., n, n).
+
+    Torch counterpart of core.steady_state.stationary_distribution: the last
+    row of Q p = 0 is replaced by Σ p = 1 and the regular system is solved.
+    """
+    A = torch.cat([Q[..., :-1, :], torch.ones_like(Q[..., -1:, :])], dim=-2)
+    b = torch.zeros(Q.shape[:-1], dtype=Q.dtype, device=Q.device)
+    b[..., -1] = 1.0
+    p = torch.linalg.solve(A, b.unsqueeze(-1)).squeeze(-1).clamp(min=0.0)
+    return p / p.sum(dim=-1, keepdim=True)
+
+
 class TorchProtocolSimulator:
     """
     Matrix-exponential simulator for all four voltage-clamp protocols.
@@ -228,8 +351,22 @@ class TorchProtocolSimulator:
     msm_def : MSMDefinition, optional — custom topology; None → 11-state model.
     n_peak_steps : int — temporal resolution inside measurement phases.
     t_total : float — total simulation time (s), needed for inactivation / recovery.
+    initial_state : array-like or "steady" — "steady" starts every protocol
+        from the stationary distribution of Q(v_hold), replacing the holding
+        phase's matrix_exp by one linear solve per holding voltage.
+    propagator : {"expm", "eig"} — "eig" locates each peak in continuous time
+        by root-finding on the eigen-expansion of the open probability
+        (core.spectral) instead of scanning n_peak_steps substeps; the peak
+        itself is then evaluated with one differentiable matrix_exp.
+    linalg : {"auto", "dense", "krylov"} — "krylov" propagates with
+        krylov_expm_multiply instead of matrix_exp; "auto" selects it for
+        models with at least KRYLOV_MIN_STATES states.  The resolved choice
+        is stored in the ``linalg`` attribute.
     """
 
+    _PROPAGATORS = ("expm", "eig")
+    _LINALG = ("auto", "dense", "krylov")
+
     def __init__(
         self,
         params: torch.Tensor,
@@ -242,8 +379,25 @@ class TorchProtocolSimulator:
         initial_state=None,
         t_total: float = 3.0,
         n_peak_steps: int = 50,
+        propagator: str = "expm",
+        linalg: str = "auto",
     ):
+        if propagator not in self._PROPAGATORS:
+            raise ValueError(
+                f"propagator must be one of {self._PROPAGATORS}, got {propagator!r}"
+            )
+        if linalg not in self._LINALG:
+            raise ValueError(f"linalg must be one of {self._LINALG}, got {linalg!r}")
+        self.steady = isinstance(initial_state, str)
+        if self.steady:
+            if initial_state != "steady":
+                raise ValueError(
+                    f"initial_state must be an array or 'steady', got {initial_state!r}"
+                )
+            initial_state = None
+        self._steady_cache: dict = {}
         self.params = params
+        self.propagator = propagator
         self.msm_def = msm_def
         self.g_k_max = g_k_max
         self.t_total = t_total
@@ -269,6 +423,11 @@ class TorchProtocolSimulator:
             self._dyn_basis = None
 
         self.s0 = torch.tensor(s0, dtype=self.dtype, device=self.device)
+        if linalg == "auto":
+            linalg = "krylov" if len(s0) >= KRYLOV_MIN_STATES else "dense"
+        self.linalg = linalg
+        self._open_vec = np.zeros(len(s0))
+        self._open_vec[self._open_idx] = 1.0
 
         self.act_proto = ActivationProtocol(act_cfg)
         self.inact_proto = InactivationProtocol(inact_cfg)
@@ -288,7 +447,13 @@ class TorchProtocolSimulator:
         return torch.linalg.matrix_exp(Q_dt)
 
     def _prop(self, P: torch.Tensor, V: float, dt: float) -> torch.Tensor:
-        """Exact propagation through a constant-voltage segment."""
+        """Exact propagation through a constant-voltage segment.
+
+        P is a state vector (n_states,) or a matrix (n_states, S) whose
+        columns are advanced together.
+        """
+        if self.linalg == "krylov":
+            return krylov_expm_multiply(self._Q(V), P, dt)
         return self._expm(self._Q(V) * dt) @ P
 
     def _prop_peak(
@@ -297,25 +462,84 @@ class TorchProtocolSimulator:
         """
         Propagate through total_dt at voltage V using n_peak_steps substeps.
 
-        Returns (P_final, peak_open_probability).
+        Returns (P_final, peak_open_probability).  P may be (n_states,) or
+        (n_states, S); in the latter case every substep is one matrix-matrix
+        product and the peak has shape (S,).
         Gradient flows through the peak value via torch.max.
         """
+        if self.propagator == "eig":
+            return self._prop_peak_eig(P, V, total_dt)
+        return self._prop_peak_scan(P, V, total_dt)
+
+    def _prop_peak_scan(
+        self, P: torch.Tensor, V: float, total_dt: float
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """_prop_peak by scanning n_peak_steps substeps (propagator="expm")."""
         n = self.n_peak_steps
         dt_sub = total_dt / n
-        M = self._expm(self._Q(V) * dt_sub)
+        krylov = self.linalg == "krylov"
+        Q = self._Q(V)
+        M = None if krylov else self._expm(Q * dt_sub)
 
         states = [P]
         for _ in range(n):
-            P = M @ P
+            P = krylov_expm_multiply(Q, P, dt_sub) if krylov else M @ P
             states.append(P)
 
-        all_states = torch.stack(states, dim=0)  # (n+1, n_states)
-        open_probs = all_states[:, self._open_idx].sum(dim=1)  # (n+1,)
-        peak = open_probs.max()
+        all_states = torch.stack(states, dim=0)  # (n+1, n_states[, S])
+        open_probs = all_states[:, self._open_idx].sum(dim=1)  # (n+1[, S])
+        peak = open_probs.max(dim=0).values
         return P, peak
 
+    def _prop_peak_eig(
+        self, P: torch.Tensor, V: float, total_dt: float
+    ) -> tuple[torch.Tensor, torch.Tensor]:
+        """
+        _prop_peak with the peak time found in closed form (propagator="eig").
+
+        The argmax t* of each column's open probability over [0, total_dt] is
+        located without gradient; the peak is then u·expm(Q t*)·P, whose
+        gradient w.r.t. the parameters is exact by the envelope theorem.
+        """
+        Q = self._Q(V)
+        prop = EigenPropagator(Q.detach().cpu().numpy())
+        if not prop.ok:
+            return self._prop_peak_scan(P, V, total_dt)
+
+        cols = P.detach().cpu().numpy().reshape(len(self._open_vec), -1)
+        times = []
+        for P0 in cols.T:
+            cand = prop.extremum_candidates(P0, self._open_vec, 0.0, total_dt)
+            times.append(cand[np.argmax(prop.state(P0, cand) @ self._open_vec)])
+        times.append(total_dt)
+
+        t = torch.tensor(times, dtype=self.dtype, device=self.device)
+        P_cols = P.reshape(P.shape[0], -1)  # (n_states, S)
+        if self.linalg == "krylov":
+            P_star = krylov_expm_multiply(Q, P_cols, t[:-1])
+            P_final = krylov_expm_multiply(Q, P, total_dt)
+        else:
+            M = self._expm(Q.unsqueeze(0) * t[:, None, None])  # (S+1, n, n)
+            P_star = torch.einsum("sij,js->is", M[:-1], P_cols)
+            P_final = M[-1] @ P
+        peak = self._open_prob(P_star)
+        return P_final, peak.reshape(P.shape[1:])
+
     def _open_prob(self, P: torch.Tensor) -> torch.Tensor:
-        return P[self._open_idx].sum()
+        return P[self._open_idx].sum(dim=0)
+
+    def _equilibrium(self, V: float) -> torch.Tensor:
+        """Stationary distribution of Q(V), cached per voltage."""
+        V = float(V)
+        if V not in self._steady_cache:
+            self._steady_cache[V] = torch_stationary_distribution(self._Q(V))
+        return self._steady_cache[V]
+
+    def _hold(self, V: float, t_hold: float) -> torch.Tensor:
+        """State after the holding phase: s0 propagated, or the equilibrium."""
+        if self.steady:
+            return self._equilibrium(V)
+        return self._prop(self.s0, V, t_hold)
 
     def run_activation(self, test_voltages=None) -> torch.Tensor:
         proto = self.act_proto
@@ -324,7 +548,7 @@ class TorchProtocolSimulator:
 
         cfg = proto.cfg
         # Single exact propagation through the common holding phase
-        P_hold = self._prop(self.s0, cfg.v_hold, cfg.t_hold)
+        P_hold = self._hold(cfg.v_hold, cfg.t_hold)
 
         conductances = []
         for V in test_voltages:
@@ -341,18 +565,18 @@ class TorchProtocolSimulator:
             test_voltages = proto.get_test_voltages()
 
         cfg = proto.cfg
-        P_hold = self._prop(self.s0, cfg.v_hold, cfg.t_hold)
+        P_hold = self._hold(cfg.v_hold, cfg.t_hold)
         t_test_dur = max(self.t_total - cfg.t_hold - cfg.t_cond, 1e-3)
 
-        currents = []
-        for V_cond in test_voltages:
-            P_cond = self._prop(P_hold, float(V_cond), cfg.t_cond)
-            baseline = self._open_prob(P_cond)
-            _, peak = self._prop_peak(P_cond, cfg.v_depo, t_test_dur)
-            g = self.g_k_max * (peak - baseline)
-            currents.append(g * (cfg.v_depo - cfg.v_hold))
-
-        curr = torch.stack(currents)
+        # Every sweep ends in the same v_depo test pulse: advance all
+        # conditioned states together as one (n_states, N_V) matrix.
+        P_cond = torch.stack(
+            [self._prop(P_hold, float(V_cond), cfg.t_cond) for V_cond in test_voltages],
+            dim=1,
+        )
+        baseline = self._open_prob(P_cond)  # (N_V,)
+        _, peak = self._prop_peak(P_cond, cfg.v_depo, t_test_dur)  # (N_V,)
+        curr = self.g_k_max * (peak - baseline) * (cfg.v_depo - cfg.v_hold)
         mx = curr.max()
         return curr / mx if mx > 0 else curr
 
@@ -365,9 +589,13 @@ class TorchProtocolSimulator:
         t_initial = cfg.t_initial
 
         # Baseline: peak open probability during initial hold
-        _, baseline_peak = self._prop_peak(self.s0, cfg.v_hold, t_initial)
+        if self.steady:
+            P_after_initial = self._equilibrium(cfg.v_hold)
+            baseline_peak = self._open_prob(P_after_initial)
+        else:
+            _, baseline_peak = self._prop_peak(self.s0, cfg.v_hold, t_initial)
+            P_after_initial = self._prop(self.s0, cfg.v_hold, t_initial)
         baseline_peak = baseline_peak.clamp(min=1e-12)
-        P_after_initial = self._prop(self.s0, cfg.v_hold, t_initial)
 
         currents = []
         for t_pulse in test_times:
@@ -392,7 +620,7 @@ class TorchProtocolSimulator:
         t_pulse = cfg.t_pulse
 
         # Equilibrate then apply inactivating pulse, tracking peak
-        P0 = self._prop(self.s0, cfg.v_hold, t_prep)
+        P0 = self._hold(cfg.v_hold, t_prep)
         P_inact, g_pre = self._prop_peak(P0, cfg.v_depo, t_pulse - t_prep)
         g_pre = g_pre.clamp(min=1e-12)
 
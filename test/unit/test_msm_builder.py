@@ -214,6 +214,12 @@ class TestQMatrix:
         Q50 = self._build_Q(V=50.0)
         np.testing.assert_allclose(Q0, Q50, atol=1e-12)
 
+    def test_sparse_Q_matches_dense(self):
+        model = DynamicModel(make_2state_msm(), np.array([4.0, 1.0]))
+        Qs = model.build_Q_sparse(0.0)
+        assert Qs.format == "csc"
+        np.testing.assert_array_equal(Qs.toarray(), model.build_Q(0.0))
+
 
 # ── Serialisation ─────────────────────────────────────────────────────────────
 
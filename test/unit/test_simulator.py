@@ -52,7 +52,9 @@ def make_2state_msm() -> MSMDefinition:
     )
 
 
-def make_sim(params=None, t_total: float = 2.0, dt: float = 1e-4) -> ProtocolSimulator:
+def make_sim(
+    params=None, t_total: float = 2.0, dt: float = 1e-4, mode: str = "segment"
+) -> ProtocolSimulator:
     """Build a ProtocolSimulator for the 2-state model with fast activation protocol."""
     msm = make_2state_msm()
     p = np.array(params if params is not None else [K_CO, K_OC])
@@ -75,6 +77,7 @@ def make_sim(params=None, t_total: float = 2.0, dt: float = 1e-4) -> ProtocolSim
         dt=dt,
         g_k_max=1.0,  # normalise by 1 so output ≡ open probability
         initial_state=np.array([1.0, 0.0]),  # start all in C
+        mode=mode,
     )
 
 
@@ -212,3 +215,402 @@ class TestSimulatorParameterVariation:
 
             if k_CO + k_OC > 5:  # faster system is closer to equilibrium
                 assert dist < 0.3, f"Fast system not near equil: dist={dist}"
+
+
+# ── segment engine vs full-grid reference ────────────────────────────────────
+
+
+class TestSegmentMode:
+
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError):
+            make_sim(mode="rk4")
+
+    def test_segment_matches_grid_2state(self):
+        grid = make_sim(t_total=0.5, mode="grid").run_activation()
+        seg = make_sim(t_total=0.5, mode="segment").run_activation()
+        np.testing.assert_allclose(seg, grid, atol=1e-12)
+
+    def test_segment_matches_grid_11state(self):
+        """Activation and inactivation share boundary semantics exactly."""
+        from core.config import INITIAL_GUESS
+
+        grid = ProtocolSimulator(INITIAL_GUESS, dt=1e-3, mode="grid")
+        seg = ProtocolSimulator(INITIAL_GUESS, dt=1e-3, mode="segment")
+        np.testing.assert_allclose(
+            seg.run_activation(), grid.run_activation(), atol=1e-10
+        )
+        np.testing.assert_allclose(
+            seg.run_inactivation(), grid.run_inactivation(), atol=1e-10
+        )
+        # CSI / recovery grid voltage functions keep the prepulse one dt longer
+        np.testing.assert_allclose(
+            seg.run_cs_inactivation(), grid.run_cs_inactivation(), atol=1e-2
+        )
+        np.testing.assert_allclose(seg.run_recovery(), grid.run_recovery(), atol=1e-2)
+
+
+# ── streaming reducers ───────────────────────────────────────────────────────
+
+
+class TestReducers:
+
+    def test_blockwise_updates_match_full_reduction(self):
+        from core.reducers import ValueAt, WindowMax, WindowMin
+
+        rng = np.random.default_rng(0)
+        states = rng.random((100, 2))
+        open_probs = states[:, 1]
+        reducers = [WindowMax(10, 70), WindowMin(5), ValueAt(42)]
+        for k in range(0, 100, 17):  # uneven blocks
+            for r in reducers:
+                r.update(k, open_probs[k : k + 17], states[k : k + 17])
+
+        assert reducers[0].value == open_probs[10:70].max()
+        assert reducers[0].index == 10 + int(np.argmax(open_probs[10:70]))
+        assert reducers[1].value == open_probs[5:].min()
+        assert reducers[2].value == open_probs[42]
+        np.testing.assert_array_equal(reducers[2].state, states[42])
+
+    def test_grid_streaming_matches_full_state_matrix(self):
+        from core.reducers import ValueAt, WindowMax
+
+        sim = make_sim(t_total=0.1, mode="grid")
+        vfunc = sim.act_proto.get_voltage_function(0.0)
+        _, states = sim._simulate(vfunc)
+        peak, at = WindowMax(3, 700), ValueAt(555)
+        _, none = sim._simulate(vfunc, [peak, at])
+
+        assert none is None
+        assert peak.value == pytest.approx(states[3:700, 1].max(), abs=1e-15)
+        assert at.value == pytest.approx(states[555, 1], abs=1e-15)
+
+    def test_strided_updates_and_error_estimate(self):
+        from core.reducers import ValueAt, WindowMax
+
+        t = np.arange(0, 400)
+        open_probs = np.exp(-(((t - 204.0) / 40.0) ** 2))
+        states = np.stack([1 - open_probs, open_probs], axis=1)
+        peak, at = WindowMax(7), ValueAt(107)
+        for k in range(7, 400, 100):  # stride-4 blocks of 25 rows
+            rows = slice(k, k + 100, 4)
+            for r in (peak, at):
+                r.update(k, open_probs[rows], states[rows], stride=4)
+
+        assert peak.value == open_probs[7::4].max()
+        assert peak.index % 4 == 3
+        assert at.value == open_probs[107] and at.error == 0.0
+        true_err = 1.0 - peak.value
+        assert true_err <= peak.error < 10 * true_err + 1e-3
+
+
+# ── shared-prefix sweep tree ─────────────────────────────────────────────────
+
+
+class TestSweepTree:
+
+    @staticmethod
+    def _record_advance(sim, monkeypatch) -> list:
+        """Record the node list of every _advance call."""
+        calls = []
+        advance = sim._advance
+
+        def _spy(P, V, nodes, n_total):
+            calls.append((V, [nd.segment for nd in nodes]))
+            return advance(P, V, nodes, n_total)
+
+        monkeypatch.setattr(sim, "_advance", _spy)
+        return calls
+
+    def test_shared_holding_phase_propagated_once(self, monkeypatch):
+        from core.config import INITIAL_GUESS
+
+        sim = ProtocolSimulator(INITIAL_GUESS, dt=1e-3)
+        calls = self._record_advance(sim, monkeypatch)
+        n_sweeps = len(sim.act_proto.get_test_voltages())
+        sim.run_activation()
+        # one shared hold segment + (test, tail) per sweep
+        assert sum(len(segs) for _, segs in calls) == 1 + 2 * n_sweeps
+
+    def test_same_voltage_segments_advanced_as_one_block(self, monkeypatch):
+        from core.config import INITIAL_GUESS
+
+        sim = ProtocolSimulator(INITIAL_GUESS, dt=1e-3)
+        calls = self._record_advance(sim, monkeypatch)
+        n_sweeps = len(sim.inact_proto.get_test_voltages())
+        sim.run_inactivation()
+        i_test = sim._idx(sim.inact_proto.t_test_start)
+        test_calls = [segs for _, segs in calls if segs[0][0] == i_test]
+        assert [len(segs) for segs in test_calls] == [n_sweeps]
+
+    def test_tree_matches_independent_sweeps(self):
+        from core.config import INITIAL_GUESS
+
+        sim = ProtocolSimulator(INITIAL_GUESS, dt=1e-3)
+        together = sim.run_recovery()
+        alone = np.concatenate(
+            [sim.run_recovery(np.array([t])) for t in sim.rec_proto.get_test_times()]
+        )
+        np.testing.assert_allclose(together, alone, atol=1e-12)
+
+
+# ── binary-exponentiation jumps and hierarchical refine ──────────────────────
+
+
+class TestBinaryJumps:
+
+    def test_jump_columns_matches_expm(self):
+        from core.config import INITIAL_GUESS
+        from scipy.linalg import expm as matrix_expm
+
+        sim = ProtocolSimulator(INITIAL_GUESS, dt=1e-4)
+        lengths = np.array([0, 1, 7, 1000, 29_999])
+        P = np.tile(sim.s0[:, None], (1, len(lengths)))
+        out = sim._jump_columns(P, 20.0, lengths)
+        Q = sim._build_Q(20.0)
+        for j, L in enumerate(lengths):
+            np.testing.assert_allclose(
+                out[:, j], matrix_expm(Q * L * sim.dt) @ sim.s0, atol=1e-12
+            )
+
+    def test_refine_matches_dense_scan(self):
+        from core.config import INITIAL_GUESS
+
+        dense = ProtocolSimulator(INITIAL_GUESS, dt=1e-4)
+        refine = ProtocolSimulator(INITIAL_GUESS, dt=1e-4, propagator="refine")
+        for run in (
+            "run_activation",
+            "run_inactivation",
+            "run_cs_inactivation",
+            "run_recovery",
+        ):
+            np.testing.assert_allclose(
+                getattr(refine, run)(), getattr(dense, run)(), atol=1e-12
+            )
+
+    def test_refine_finds_grid_argmax(self):
+        from core.reducers import WindowMax
+
+        sim = ProtocolSimulator(
+            [K_CO, K_OC],
+            msm_def=make_2state_msm(),
+            t_total=0.5,
+            dt=1e-4,
+            propagator="refine",
+        )
+        peak = WindowMax(0)
+        sim._refine_window(peak, np.array([1.0, 0.0]), 0.0, 0, 4321)
+        assert peak.index == 4321  # p_O rises monotonically
+        assert peak.value == pytest.approx(P_O_EQ * (1 - np.exp(-K_TOT * 0.4321)))
+
+
+# ── eigendecomposition propagator ────────────────────────────────────────────
+
+
+class TestEigenPropagator:
+
+    def test_state_matches_analytic(self):
+        from core.msm_builder import DynamicModel
+        from core.spectral import EigenPropagator
+
+        Q = DynamicModel(make_2state_msm(), np.array([K_CO, K_OC])).build_Q(0.0)
+        prop = EigenPropagator(Q)
+        ts = np.array([0.05, 0.3, 1.0])
+        p_O = prop.state(np.array([1.0, 0.0]), ts)[:, 1]
+        np.testing.assert_allclose(
+            p_O, P_O_EQ * (1.0 - np.exp(-K_TOT * ts)), atol=1e-12
+        )
+
+    def test_peak_time_found_by_root_finding(self):
+        """C → O → I: p_O(t) peaks at t* = ln(k2/k1) / (k2 - k1)."""
+        from core.spectral import EigenPropagator
+
+        k1, k2 = 3.0, 50.0
+        Q = np.array([[-k1, 0.0, 0.0], [k1, -k2, 0.0], [0.0, k2, 0.0]])
+        crit = EigenPropagator(Q).critical_times(
+            np.array([1.0, 0.0, 0.0]), np.array([0.0, 1.0, 0.0]), 2.0
+        )
+        assert crit == pytest.approx([np.log(k2 / k1) / (k2 - k1)], abs=1e-10)
+
+    def test_eig_propagator_matches_grid_scan(self):
+        from core.config import INITIAL_GUESS
+
+        expm = ProtocolSimulator(INITIAL_GUESS, dt=1e-4)
+        eig = ProtocolSimulator(INITIAL_GUESS, dt=1e-4, propagator="eig")
+        for run in ("run_activation", "run_inactivation", "run_recovery"):
+            np.testing.assert_allclose(
+                getattr(eig, run)(), getattr(expm, run)(), atol=1e-5
+            )
+
+
+# ── shared matrix cache ──────────────────────────────────────────────────────
+
+
+class TestMatrixCache:
+
+    @pytest.fixture(autouse=True)
+    def _fresh_cache(self):
+        from core.simulator import clear_matrix_cache, set_matrix_cache_size
+
+        clear_matrix_cache()
+        yield
+        set_matrix_cache_size(256)
+        clear_matrix_cache()
+
+    def test_second_instance_hits_cache(self):
+        from core.simulator import matrix_cache_info
+
+        first = make_sim(t_total=0.5).run_activation()
+        misses = matrix_cache_info().misses
+        second = make_sim(t_total=0.5).run_activation()
+        info = matrix_cache_info()
+        assert info.misses == misses
+        assert info.hits > 0
+        np.testing.assert_array_equal(first, second)
+
+    def test_different_params_miss(self):
+        from core.simulator import matrix_cache_info
+
+        make_sim(t_total=0.5).run_activation()
+        misses = matrix_cache_info().misses
+        make_sim(params=[2.0, 3.0], t_total=0.5).run_activation()
+        assert matrix_cache_info().misses > misses
+
+    def test_lru_eviction_bounds_size(self):
+        from core.simulator import matrix_cache_info, set_matrix_cache_size
+
+        set_matrix_cache_size(2)
+        for k in (1.0, 2.0, 3.0):
+            make_sim(params=[k, 1.0], t_total=0.5).run_activation()
+        assert matrix_cache_info().currsize == 2
+
+
+# ── phase-adaptive resolution ────────────────────────────────────────────────
+
+
+class TestResolution:
+
+    def test_invalid_resolution_rejected(self):
+        from core.config import INITIAL_GUESS
+
+        with pytest.raises(ValueError):
+            ProtocolSimulator(INITIAL_GUESS, resolution={"test": 0})
+        with pytest.raises(ValueError):
+            ProtocolSimulator(INITIAL_GUESS, resolution=2.5)
+        with pytest.raises(ValueError):
+            ProtocolSimulator(INITIAL_GUESS, mode="grid", resolution=10)
+
+    def test_stride_one_matches_default(self):
+        from core.config import INITIAL_GUESS
+
+        ref = ProtocolSimulator(INITIAL_GUESS, dt=1e-3)
+        sim = ProtocolSimulator(INITIAL_GUESS, dt=1e-3, resolution=1)
+        np.testing.assert_array_equal(sim.run_recovery(), ref.run_recovery())
+
+    @pytest.mark.parametrize("resolution", [10, {"test": 2, "default": 5}])
+    def test_coarse_phases_close_to_reference(self, resolution):
+        from core.config import INITIAL_GUESS
+
+        ref = ProtocolSimulator(INITIAL_GUESS, dt=1e-4)
+        sim = ProtocolSimulator(INITIAL_GUESS, dt=1e-4, resolution=resolution)
+        for run, name in (
+            ("run_activation", "activation"),
+            ("run_inactivation", "inactivation"),
+            ("run_cs_inactivation", "cs_inactivation"),
+            ("run_recovery", "recovery"),
+        ):
+            y = getattr(sim, run)()
+            np.testing.assert_allclose(y, getattr(ref, run)(), atol=1e-3)
+            assert sim.errors[name].shape == y.shape
+            assert np.all(sim.errors[name] < 1e-2)
+
+    def test_stride_window_edges_sampled(self):
+        """A stride longer than the window still samples both of its ends."""
+        sim = make_sim(t_total=0.5, dt=1e-4)
+        coarse = ProtocolSimulator(
+            sim.params,
+            msm_def=make_2state_msm(),
+            act_cfg=sim.act_proto.cfg,
+            t_total=0.5,
+            dt=1e-4,
+            g_k_max=1.0,
+            initial_state=np.array([1.0, 0.0]),
+            resolution=10**6,
+        )
+        # p_O rises monotonically, so the peak sits at the window end
+        np.testing.assert_allclose(
+            coarse.run_activation(), sim.run_activation(), atol=1e-12
+        )
+
+
+# ── steady-state initial conditions ──────────────────────────────────────────
+
+
+class TestSteadyState:
+
+    def test_stationary_distribution_2state(self):
+        from core.msm_builder import DynamicModel
+        from core.steady_state import stationary_distribution
+
+        Q = DynamicModel(make_2state_msm(), np.array([K_CO, K_OC])).build_Q(0.0)
+        np.testing.assert_allclose(
+            stationary_distribution(Q), [1 - P_O_EQ, P_O_EQ], atol=1e-14
+        )
+        stack = stationary_distribution(np.stack([Q, 2 * Q]))
+        np.testing.assert_allclose(stack[1], [1 - P_O_EQ, P_O_EQ], atol=1e-14)
+
+    def test_steady_start_equals_long_hold(self):
+        from core.config import INITIAL_GUESS
+
+        steady = ProtocolSimulator(INITIAL_GUESS, dt=1e-3, initial_state="steady")
+        eq = steady._start_state(steady.rec_proto)
+        relaxed = ProtocolSimulator(INITIAL_GUESS, dt=1e-3)
+        s0 = relaxed.s0 / relaxed.s0.sum()
+        np.testing.assert_allclose(
+            relaxed._jump_matrix(-90.0, 50_000) @ s0, eq, atol=1e-10
+        )
+        held = ProtocolSimulator(INITIAL_GUESS, dt=1e-3, initial_state=eq)
+        for run in ("run_activation", "run_cs_inactivation", "run_recovery"):
+            np.testing.assert_allclose(
+                getattr(steady, run)(), getattr(held, run)(), atol=1e-12
+            )
+
+    def test_unknown_initial_state_rejected(self):
+        from core.config import INITIAL_GUESS
+
+        with pytest.raises(ValueError):
+            ProtocolSimulator(INITIAL_GUESS, initial_state="equilibrium")
+
+
+# ── sparse Krylov propagation ────────────────────────────────────────────────
+
+
+class TestKrylov:
+
+    def test_unknown_linalg_rejected(self):
+        with pytest.raises(ValueError):
+            ProtocolSimulator([K_CO, K_OC], msm_def=make_2state_msm(), linalg="lu")
+        with pytest.raises(ValueError):
+            ProtocolSimulator(
+                [K_CO, K_OC], msm_def=make_2state_msm(), mode="grid", linalg="krylov"
+            )
+
+    def test_auto_selects_by_size(self, monkeypatch):
+        from core.config import INITIAL_GUESS
+
+        assert ProtocolSimulator(INITIAL_GUESS).linalg == "dense"
+        monkeypatch.setattr(ProtocolSimulator, "KRYLOV_MIN_STATES", 11)
+        assert ProtocolSimulator(INITIAL_GUESS).linalg == "krylov"
+        assert ProtocolSimulator(INITIAL_GUESS, mode="grid").linalg == "dense"
+
+    @pytest.mark.parametrize("resolution", [None, 7])
+    def test_krylov_matches_dense(self, resolution):
+        from core.config import INITIAL_GUESS
+
+        kw = dict(dt=1e-3, resolution=resolution)
+        dense = ProtocolSimulator(INITIAL_GUESS, linalg="dense", **kw)
+        krylov = ProtocolSimulator(INITIAL_GUESS, linalg="krylov", **kw)
+        for run in ("run_activation", "run_inactivation", "run_recovery"):
+            np.testing.assert_allclose(
+                getattr(krylov, run)(), getattr(dense, run)(), atol=1e-10
+            )
@@ -0,0 +1,209 @@
+"""
+Unit tests — TorchProtocolSimulator and BatchedProtocolSimulator.
+
+The differentiable simulators are checked against the NumPy
+ProtocolSimulator conventions on the default 11-state model, and their
+vectorised code paths against the equivalent per-sweep computations.
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from core.config import INITIAL_GUESS
+from core.torch_de import BatchedProtocolSimulator
+from core.torch_simulator import TorchProtocolSimulator
+
+# ── helpers ───────────────────────────────────────────────────────────────────
+
+
+def make_params(requires_grad: bool = False) -> torch.Tensor:
+    return torch.tensor(INITIAL_GUESS, dtype=torch.float64, requires_grad=requires_grad)
+
+
+def make_population(n: int = 3) -> torch.Tensor:
+    scale = torch.linspace(0.9, 1.1, n, dtype=torch.float64).unsqueeze(1)
+    return make_params().unsqueeze(0) * scale
+
+
+# ── sweep-matrix propagation ─────────────────────────────────────────────────
+
+
+class TestSweepMatrix:
+
+    def test_prop_peak_matrix_matches_columns(self):
+        sim = TorchProtocolSimulator(make_params())
+        cols = [sim._prop(sim.s0, V, 0.2) for V in (-90.0, -30.0, 20.0)]
+        P_final, peak = sim._prop_peak(torch.stack(cols, dim=1), 60.0, 0.5)
+        for j, P in enumerate(cols):
+            P_j, peak_j = sim._prop_peak(P, 60.0, 0.5)
+            torch.testing.assert_close(P_final[:, j], P_j)
+            torch.testing.assert_close(peak[j], peak_j)
+
+    def test_batched_prop_peak_matrix_matches_columns(self):
+        sim = BatchedProtocolSimulator(make_population())
+        cols = [sim._prop(sim.s0, V, 0.2) for V in (-90.0, 20.0)]
+        P_final, peak = sim._prop_peak(torch.stack(cols, dim=2), 60.0, 0.5)
+        for j, P in enumerate(cols):
+            P_j, peak_j = sim._prop_peak(P, 60.0, 0.5)
+            torch.testing.assert_close(P_final[:, :, j], P_j)
+            torch.testing.assert_close(peak[:, j], peak_j)
+
+
+# ── eigendecomposition peak location ─────────────────────────────────────────
+
+
+class TestEigPropagator:
+
+    def test_eig_peak_matches_fine_scan(self):
+        params = make_params()
+        fine = TorchProtocolSimulator(params, n_peak_steps=2000).run_activation()
+        eig = TorchProtocolSimulator(params, propagator="eig").run_activation()
+        torch.testing.assert_close(eig, fine, atol=1e-5, rtol=0)
+
+    def test_eig_peak_is_differentiable(self):
+        params = make_params(requires_grad=True)
+        sim = TorchProtocolSimulator(params, propagator="eig")
+        sim.run_recovery().sum().backward()
+        assert torch.all(torch.isfinite(params.grad))
+        assert params.grad.abs().sum() > 0
+
+
+# ── steady-state initial conditions ──────────────────────────────────────────
+
+
+class TestSteadyState:
+
+    def test_matches_numpy_solver(self):
+        from core.simulator import ProtocolSimulator
+        from core.steady_state import stationary_distribution
+
+        sim = TorchProtocolSimulator(make_params(), initial_state="steady")
+        p = sim._equilibrium(-90.0)
+        Q = ProtocolSimulator(INITIAL_GUESS)._build_Q(-90.0)
+        np.testing.assert_allclose(p.numpy(), stationary_distribution(Q), atol=1e-12)
+        torch.testing.assert_close(sim._Q(-90.0) @ p, torch.zeros_like(p))
+
+    def test_steady_equals_long_hold(self):
+        params = make_params()
+        steady = TorchProtocolSimulator(params, initial_state="steady")
+        long_hold = TorchProtocolSimulator(params)
+        P_eq = long_hold._prop(long_hold.s0, -90.0, 50.0)
+        long_hold.s0 = P_eq
+        torch.testing.assert_close(
+            steady.run_inactivation(), long_hold.run_inactivation()
+        )
+
+    def test_batched_steady_matches_members(self):
+        pop = make_population()
+        batch = BatchedProtocolSimulator(pop, initial_state="steady")
+        P_eq = batch._equilibrium(-90.0)
+        for i in range(pop.shape[0]):
+            single = TorchProtocolSimulator(pop[i], initial_state="steady")
+            torch.testing.assert_close(P_eq[i], single._equilibrium(-90.0))
+
+    def test_steady_is_differentiable(self):
+        params = make_params(requires_grad=True)
+        sim = TorchProtocolSimulator(params, initial_state="steady")
+        sim.run_recovery().sum().backward()
+        assert params.grad is not None and torch.isfinite(params.grad).all()
+
+    def test_unknown_initial_state_rejected(self):
+        with pytest.raises(ValueError):
+            TorchProtocolSimulator(make_params(), initial_state="equilibrium")
+
+
+# ── Krylov propagation ───────────────────────────────────────────────────────
+
+
+class TestKrylov:
+
+    @staticmethod
+    def _generator(n: int = 40, seed: int = 0) -> torch.Tensor:
+        g = torch.Generator().manual_seed(seed)
+        R = torch.rand(n, n, generator=g, dtype=torch.float64) * 100.0
+        R = R * (torch.rand(n, n, generator=g, dtype=torch.float64) < 0.2)
+        R.fill_diagonal_(0.0)
+        return R - torch.diag(R.sum(dim=0))
+
+    def test_matches_matrix_exp(self):
+        from core.torch_simulator import krylov_expm_multiply
+
+        Q = self._generator()
+        P = torch.softmax(torch.arange(40.0, dtype=torch.float64), 0)
+        for t in (1e-4, 0.05, 2.0):
+            torch.testing.assert_close(
+                krylov_expm_multiply(Q, P, t),
+                torch.linalg.matrix_exp(Q * t) @ P,
+                atol=1e-12,
+                rtol=0,
+            )
+
+    def test_per_column_times_and_batches(self):
+        from core.torch_simulator import krylov_expm_multiply
+
+        Q = torch.stack([self._generator(seed=1), self._generator(seed=2)])
+        P = torch.rand(2, 40, 3, dtype=torch.float64)
+        t = torch.tensor([0.01, 0.1, 0.3], dtype=torch.float64)
+        out = krylov_expm_multiply(Q, P, t)
+        for b in range(2):
+            for j in range(3):
+                ref = torch.linalg.matrix_exp(Q[b] * t[j]) @ P[b, :, j]
+                torch.testing.assert_close(out[b, :, j], ref, atol=1e-12, rtol=0)
+
+    def test_gradient_matches_matrix_exp(self):
+        from core.torch_simulator import krylov_expm_multiply
+
+        Q = self._generator().requires_grad_(True)
+        P = torch.rand(40, dtype=torch.float64)
+        krylov_expm_multiply(Q, P, 0.02).sum().backward()
+        g_krylov = Q.grad.clone()
+        Q.grad = None
+        (torch.linalg.matrix_exp(Q * 0.02) @ P).sum().backward()
+        torch.testing.assert_close(g_krylov, Q.grad, atol=1e-12, rtol=0)
+
+    def test_simulators_match_dense(self):
+        params = make_params()
+        dense = TorchProtocolSimulator(params, n_peak_steps=10, linalg="dense")
+        krylov = TorchProtocolSimulator(params, n_peak_steps=10, linalg="krylov")
+        assert dense.linalg == "dense" and krylov.linalg == "krylov"
+        torch.testing.assert_close(krylov.run_recovery(), dense.run_recovery())
+
+        pop = make_population()
+        b_dense = BatchedProtocolSimulator(pop, n_peak_steps=10, linalg="dense")
+        b_krylov = BatchedProtocolSimulator(pop, n_peak_steps=10, linalg="krylov")
+        cfg = b_dense.act_proto.cfg
+        P0 = b_dense._prop(b_dense.s0, cfg.v_hold, cfg.t_hold)
+        torch.testing.assert_close(
+            b_krylov._prop_peak(P0, 20.0, 0.2)[1], b_dense._prop_peak(P0, 20.0, 0.2)[1]
+        )
+
+    def test_scatter_basis_matches_dense_basis(self, monkeypatch):
+        import core.torch_simulator as ts
+        from core.msm_builder import MSMDefinition, ParamSpec, StateSpec, TransitionSpec
+
+        msm = MSMDefinition(
+            states=[
+                StateSpec(name="C", state_type="closed"),
+                StateSpec(name="I", state_type="inactivated"),
+                StateSpec(name="O", state_type="open"),
+            ],
+            transitions=[
+                TransitionSpec(
+                    from_state="C", to_state="O", rate_expr="a * exp(V * EXP_FACTOR)"
+                ),
+                TransitionSpec(from_state="O", to_state="C", rate_expr="b"),
+                TransitionSpec(from_state="O", to_state="I", rate_expr="a * b"),
+                TransitionSpec(from_state="I", to_state="C", rate_expr="b / a"),
+            ],
+            parameters=[ParamSpec("a", 2.0, 0.1, 10.0), ParamSpec("b", 3.0, 0.1, 10.0)],
+        )
+        params = torch.tensor([2.0, 3.0], dtype=torch.float64)
+        dense_basis, _ = ts._precompute_dynamic_basis(msm, torch.float64)
+        monkeypatch.setattr(ts, "DENSE_BASIS_MAX_STATES", 0)
+        scatter, _ = ts._precompute_dynamic_basis(msm, torch.float64)
+        assert isinstance(scatter, ts._ScatterBasis)
+        torch.testing.assert_close(
+            ts.build_Q_dynamic(params, 20.0, msm, scatter),
+            ts.build_Q_dynamic(params, 20.0, msm, dense_basis),
+        )